@@ -1,9 +1,12 @@
 # app/answer_with_citations.py
 from pathlib import Path
-import json
-import faiss
+import argparse
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from app.embedder import load_embedder, embedder_id
+from app.io_utils import load_jsonl_cached
+from app.vector_index import EMB_PATH, load_embeddings, read_faiss_index, topk_dense, topk_dense_batch
+from app.query_cache import QueryCache, file_signature
 
 ROOT = Path(__file__).resolve().parents[1]
 INDEX_PATH = ROOT / "processed" / "vectors.faiss"
@@ -12,43 +15,10 @@ CHUNKS_PATH = ROOT / "processed" / "chunks.jsonl"
 
 MODEL_NAME = "all-MiniLM-L6-v2"
 TOP_K = 5
+BATCH_SIZE = 64   # --batch: questions per encode() call
 GOOD_SCORE = 0.35  # if top score below this, we say "insufficient context"
 
-def load_jsonl(path: Path):
-    items = []
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                items.append(json.loads(line))
-    return items
-
-def main():
-    if not INDEX_PATH.exists():
-        print("❌ Missing FAISS index. Run app/build_index.py first.")
-        return
-    if not META_PATH.exists() or not CHUNKS_PATH.exists():
-        print("❌ Missing metadata or chunks. Build index first.")
-        return
-
-    # Load index + data
-    index = faiss.read_index(str(INDEX_PATH))
-    meta = load_jsonl(META_PATH)         # aligned with index IDs
-    chunks = load_jsonl(CHUNKS_PATH)     # same order as meta
-
-    # Embed query
-    model = SentenceTransformer(MODEL_NAME)
-    query = input("Your question: ").strip()
-    if not query:
-        print("No query provided.")
-        return
-    q = model.encode([query], normalize_embeddings=True).astype("float32")
-
-    # Search
-    scores, ids = index.search(q, TOP_K)
-    scores = scores[0]
-    ids = ids[0]
-
+def print_answer(ids, scores, chunks):
     # Guardrail: insufficient context if top score is low or invalid id
     if len(ids) == 0 or ids[0] < 0 or scores[0] < GOOD_SCORE:
         print("🤔 Insufficient context in the indexed document. Try rephrasing or adding more filings.")
@@ -85,5 +55,86 @@ def main():
 
     print("\n(score top-1 =", f"{scores[0]:.3f}", ")")
 
+def run_batch(path: Path, use_faiss: bool):
+    """Answer every line of `path`: one batched encode + one batched search for all questions."""
+    queries = [q.strip() for q in path.read_text(encoding="utf-8").splitlines() if q.strip()]
+    if not queries:
+        print(f"No queries in {path}.")
+        return
+
+    chunks = load_jsonl_cached(CHUNKS_PATH)
+    model = load_embedder(MODEL_NAME)
+    Q = model.encode(queries, batch_size=BATCH_SIZE, normalize_embeddings=True).astype("float32")
+
+    # one call for all queries: FAISS threads over queries, NumPy runs a single GEMM
+    if use_faiss:
+        all_scores, all_ids = read_faiss_index(INDEX_PATH).search(Q, TOP_K)
+    else:
+        all_scores, all_ids = topk_dense_batch(load_embeddings(EMB_PATH), Q, TOP_K)
+
+    for query, scores, ids in zip(queries, all_scores, all_ids):
+        print(f"\n##### {query}")
+        print_answer(ids, scores, chunks)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--faiss", action="store_true",
+                    help="search vectors.faiss instead of the dense matrix (very large corpora)")
+    ap.add_argument("--batch", type=Path, metavar="QUERIES_TXT",
+                    help="answer every line of a text file instead of prompting (no query cache)")
+    args = ap.parse_args()
+
+    # dense matrix is the default; fall back to FAISS if only the index was built
+    use_faiss = args.faiss or not EMB_PATH.exists()
+    if use_faiss and not INDEX_PATH.exists():
+        print("❌ Missing vectors. Run `python -m app.build_index` first.")
+        return
+    if not META_PATH.exists() or not CHUNKS_PATH.exists():
+        print("❌ Missing metadata or chunks. Build index first.")
+        return
+
+    if args.batch is not None:
+        if not args.batch.exists():
+            print(f"❌ Missing: {args.batch}")
+            return
+        run_batch(args.batch, use_faiss)
+        return
+
+    # Ask first: nothing below is paid for until there is a question
+    query = input("Your question: ").strip()
+    if not query:
+        print("No query provided.")
+        return
+
+    # Load index + data (both memory-mapped; pages are read as the search touches them)
+    if use_faiss:
+        index = read_faiss_index(INDEX_PATH)
+    else:
+        embs = load_embeddings(EMB_PATH)  # (N, D), memory-mapped
+    chunks = load_jsonl_cached(CHUNKS_PATH)     # aligned with index IDs
+
+    # Embed query (exact cache hit skips loading the model at all)
+    cache = QueryCache(embedder_id(MODEL_NAME), file_signature(INDEX_PATH if use_faiss else EMB_PATH, TOP_K))
+    hit = cache.get(query)
+    if hit is not None:
+        q = hit["vec"].reshape(1, -1)
+    else:
+        model = load_embedder(MODEL_NAME)
+        q = model.encode([query], normalize_embeddings=True).astype("float32")
+        hit = cache.similar(q[0])
+
+    # Search (or reuse cached top-k for the same / a near-identical query)
+    if hit is not None and hit["ids"] is not None:
+        scores, ids = hit["scores"], hit["ids"]
+    elif use_faiss:
+        scores, ids = index.search(q, TOP_K)
+        scores = scores[0]
+        ids = ids[0]
+    else:
+        scores, ids = topk_dense(embs, q[0], TOP_K)
+    cache.put(query, q[0], ids, scores)
+
+    print_answer(ids, scores, chunks)
+
 if __name__ == "__main__":
     main()
@@ -1,59 +1,79 @@
 # app/build_index.py
 from pathlib import Path
-import json
+import argparse
 import faiss
 import numpy as np
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
+
+from app.embedder import load_embedder, embedder_id
+from app.formatting import save_chunk_aux
+from app.io_utils import dumps_line, file_stamp, loads_line
+from app.vector_index import EMB_PATH, INDEX_TYPES, build_faiss_index, save_embeddings
 
 ROOT = Path(__file__).resolve().parents[1]
 CHUNKS_PATH = ROOT / "processed" / "chunks.jsonl"
 INDEX_PATH = ROOT / "processed" / "vectors.faiss"
 META_PATH = ROOT / "processed" / "chunk_meta.jsonl"   # id-aligned metadata
+AUX_PATH = ROOT / "processed" / "chunk_aux.npz"       # id-aligned sentence splits + TOC flags
 
 MODEL_NAME = "all-MiniLM-L6-v2"
-BATCH_SIZE = 64
+BATCH_SIZE = 128
 
 def read_jsonl(path: Path):
-    with path.open("r", encoding="utf-8") as f:
+    loads = loads_line
+    with path.open("rb") as f:
         for line in f:
             line = line.strip()
             if not line:
                 continue
-            yield json.loads(line)
+            yield loads(line)
 
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--index-type", choices=INDEX_TYPES, default="hnsw",
+                    help="FAISS index for vectors.faiss (default: hnsw; ivfpq for very large corpora)")
+    args = ap.parse_args()
+
     if not CHUNKS_PATH.exists():
         print(f"❌ Missing: {CHUNKS_PATH}")
         return
 
-    # Load chunks
+    # Load chunks (stamp first, so a concurrent append makes the sentence cache stale, not wrong)
+    chunks_stamp = file_stamp(CHUNKS_PATH)
     chunks = list(read_jsonl(CHUNKS_PATH))
     texts = [c["text"] for c in chunks]
     print(f"Loaded {len(texts)} chunks.")
 
     # Load embedding model
-    print(f"Loading model: {MODEL_NAME}")
-    model = SentenceTransformer(MODEL_NAME)
+    print(f"Loading model: {embedder_id(MODEL_NAME)}")
+    model = load_embedder(MODEL_NAME)
 
-    # Embed in batches
-    embs = []
-    for i in tqdm(range(0, len(texts), BATCH_SIZE), desc="Embedding"):
-        batch = texts[i:i+BATCH_SIZE]
-        vecs = model.encode(batch, normalize_embeddings=True, show_progress_bar=False)
-        embs.append(vecs)
-    embs = np.vstack(embs).astype("float32")  # shape: (N, D)
-    n, d = embs.shape
+    # Embed in batches, shortest texts first: each batch is padded to its longest
+    # member, so grouping similar lengths cuts the padded tokens we pay for
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    texts_sorted = [texts[i] for i in order]
+    # Preallocated (N, D) output: each batch is scattered straight back to its
+    # chunk rows, so there is no list of batches + vstack copy at the end
+    n, d = len(texts), model.get_sentence_embedding_dimension()
+    embs = np.empty((n, d), dtype=np.float32)
+    for i in tqdm(range(0, n, BATCH_SIZE), desc="Embedding"):
+        batch = texts_sorted[i:i+BATCH_SIZE]
+        vecs = model.encode(batch, batch_size=BATCH_SIZE, normalize_embeddings=True,
+                            convert_to_numpy=True, show_progress_bar=False)
+        embs[order[i:i+len(batch)]] = vecs.astype(np.float32, copy=False)
     print(f"Embeddings shape: {embs.shape}")
 
+    # Raw normalized matrix (stored float16) for the NumPy search path
+    save_embeddings(embs, EMB_PATH)
+    print(f"✅ Wrote embeddings → {EMB_PATH}")
+
     # Build FAISS index (cosine via inner product on normalized vectors)
-    index = faiss.IndexFlatIP(d)
-    index.add(embs)
+    index = build_faiss_index(embs, args.index_type)
     faiss.write_index(index, str(INDEX_PATH))
-    print(f"✅ Wrote FAISS index → {INDEX_PATH}")
+    print(f"✅ Wrote FAISS index ({args.index_type}) → {INDEX_PATH}")
 
     # Write aligned metadata for later lookup
-    with META_PATH.open("w", encoding="utf-8") as f:
+    with META_PATH.open("wb") as f:
         for rec in chunks:
             out = {
                 "doc": rec.get("doc"),
@@ -63,8 +83,12 @@ def main():
                 # keep a short preview to display in answers
                 "preview": (rec.get("text") or "")[:240].replace("\n", " ")
             }
-            f.write(json.dumps(out, ensure_ascii=False) + "\n")
+            f.write(dumps_line(out))
     print(f"✅ Wrote metadata (aligned to index ids) → {META_PATH}")
 
+    # Sentence splits + TOC flags, so answer formatting skips the regex work per query
+    save_chunk_aux(AUX_PATH, texts, chunks_stamp)
+    print(f"✅ Wrote sentence cache (aligned to index ids) → {AUX_PATH}")
+
 if __name__ == "__main__":
     main()
@@ -1,6 +1,9 @@
 # app/check_pdf.py
 from pathlib import Path
-import pdfplumber
+try:
+    import pymupdf  # type: ignore
+except ImportError:
+    import fitz as pymupdf  # type: ignore  # PyMuPDF < 1.24 only ships the `fitz` name
 
 # 1) point to your file
 PDF_PATH = Path(__file__).resolve().parents[1] / "data" / "filings" / "Apple_10K_2023.pdf"
@@ -11,14 +14,14 @@ def main():
               "Make sure the filename matches exactly (case matters).")
         return
 
-    with pdfplumber.open(PDF_PATH) as pdf:
-        n_pages = len(pdf.pages)
+    with pymupdf.open(str(PDF_PATH)) as doc:
+        n_pages = doc.page_count
         print(f"Opened PDF: {PDF_PATH.name}")
         print(f"   Pages: {n_pages}")
 
         # 2) show a short preview from the first page
-        first_page = pdf.pages[0]
-        text = (first_page.extract_text() or "").strip()
+        first_page = doc[0]
+        text = (first_page.get_text("text") or "").strip()
         preview = text[:800].replace("\n", " ")
         print("\n--- Page 1 preview (first ~800 chars) ---")
         print(preview if preview else "(no extractable text on page 1)")
@@ -1,80 +1,139 @@
 # app/chunk_pdf.py
 from pathlib import Path
 import json
+import os
 import re
-import pdfplumber
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+try:
+    import pymupdf  # type: ignore
+except ImportError:
+    import fitz as pymupdf  # type: ignore  # PyMuPDF < 1.24 only ships the `fitz` name
+
+# Optional JIT for the packing loop
+try:
+    from numba import njit  # type: ignore
+except Exception:
+    def njit(*args, **kwargs):
+        # numba not installed: run the same code as plain Python
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
 
 # === config ===
 DOC_NAME = "Apple_10K_2023.pdf"
 TARGET_WORDS = 900
 OVERLAP_WORDS = 120
+PARALLEL_MIN_PAGES = 64   # MuPDF is fast; below this, process start-up costs more than it saves
 
 ROOT = Path(__file__).resolve().parents[1]
 PDF_PATH = ROOT / "data" / "filings" / DOC_NAME
 OUT_PATH = ROOT / "processed" / "chunks.jsonl"
 
+_WS_RE = re.compile(r"[ \t]+")
+_NL_RE = re.compile(r"\n{3,}")
+_PARA_SPLIT_RE = re.compile(r"\n\s*\n")
+
 def normalize_spaces(text: str) -> str:
     text = text.replace("\xa0", " ")
     # keep single newlines; collapse multiple blank lines to one blank line
-    text = re.sub(r"[ \t]+", " ", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = _WS_RE.sub(" ", text)
+    text = _NL_RE.sub("\n\n", text)
     return text.strip()
 
 def split_into_paragraphs(text: str):
     # split on blank lines only; keep paragraphs intact
-    paras = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+    paras = [p.strip() for p in _PARA_SPLIT_RE.split(text) if p.strip()]
     return paras
 
 def word_count(s: str) -> int:
     return len(s.split())
 
+# PyMuPDF documents can't be pickled, so each worker process opens the PDF once
+_OPEN_PDFS = {}
+
+def extract_page(pdf_path: Path, page_idx: int):
+    """Worker: return (page_idx, raw text) for one page."""
+    key = str(pdf_path)
+    doc = _OPEN_PDFS.get(key)
+    if doc is None:
+        doc = _OPEN_PDFS[key] = pymupdf.open(key)
+    return page_idx, doc[page_idx].get_text("text")
+
+def extract_page_texts(pdf_path: Path, max_workers=None):
+    """Raw text per page, in page order. Pages are extracted in parallel for long PDFs."""
+    workers = max_workers or os.cpu_count() or 1
+    with pymupdf.open(str(pdf_path)) as doc:
+        n_pages = doc.page_count
+        if workers <= 1 or n_pages < PARALLEL_MIN_PAGES:
+            return [page.get_text("text") for page in doc]
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        results = list(ex.map(extract_page, [pdf_path] * n_pages, range(n_pages),
+                              chunksize=max(1, n_pages // (workers * 4))))
+    results.sort(key=lambda r: r[0])
+    return [text for _, text in results]
+
 def make_paragraph_corpus(pdf_path: Path):
     """Return (all_paras, para_page_map). Each para has a known page number."""
     all_paras = []
     para_page_map = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for i, page in enumerate(pdf.pages):
-            page_no = i + 1  # 1-indexed
-            text = (page.extract_text() or "")
-            text = normalize_spaces(text)
-            paras = split_into_paragraphs(text)
-            all_paras.extend(paras)
-            para_page_map.extend([page_no] * len(paras))
+    for i, text in enumerate(extract_page_texts(pdf_path)):
+        page_no = i + 1  # 1-indexed
+        text = normalize_spaces(text)
+        paras = split_into_paragraphs(text)
+        all_paras.extend(paras)
+        para_page_map.extend([page_no] * len(paras))
     return all_paras, para_page_map
 
-def chunk_by_paragraph_index(all_paras, target_words=TARGET_WORDS, overlap_words=OVERLAP_WORDS):
+@njit(cache=True)
+def pack_spans(word_counts, target_words, overlap_words):
     """
-    Greedy pack paragraphs into chunks and return a list of (start_idx, end_idx) pairs,
-    where indices refer to all_paras. Overlap is applied in paragraph units so indices
-    stay consistent.
+    Integer-only core of chunk_by_paragraph_index: returns (starts, ends) int32 arrays,
+    ends exclusive. Kept free of Python objects so numba can compile it to native code.
+
+    Uses a prefix sum of word counts, so "words in paragraphs [i, j)" is
+    cum[j] - cum[i] and both the chunk end and the overlap start are one
+    binary search instead of a walk over paragraphs.
     """
-    spans = []
-    n = len(all_paras)
+    n = word_counts.shape[0]
+    cum = np.zeros(n + 1, dtype=np.int64)
+    cum[1:] = np.cumsum(word_counts)
+
+    starts = np.empty(n, dtype=np.int32)  # at most one span per start index
+    ends = np.empty(n, dtype=np.int32)
+    m = 0
     i = 0
     while i < n:
-        # start a new chunk at i
-        total = 0
-        j = i
-        while j < n and (total + word_count(all_paras[j]) <= target_words or j == i):
-            total += word_count(all_paras[j])
-            j += 1
+        # largest j with words in [i, j) <= target_words, always taking paragraph i
+        j = np.searchsorted(cum, cum[i] + target_words, side="right") - 1
+        if j <= i:
+            j = i + 1
         # now we have a chunk [i, j) (end exclusive)
-        start_idx = i
-        end_idx_excl = j
-        spans.append((start_idx, end_idx_excl))
-
-        # compute next i with overlap (in words) translated to paragraphs
-        # walk backward from j-1 adding paragraphs until overlap_words reached
-        overlap_paras = 0
-        acc_words = 0
-        k = j - 1
-        while k >= i and acc_words < overlap_words:
-            acc_words += word_count(all_paras[k])
-            overlap_paras += 1
-            k -= 1
+        starts[m] = i
+        ends[m] = j
+        m += 1
+
+        # overlap: fewest trailing paragraphs of [i, j) holding >= overlap_words
+        if overlap_words > 0:
+            k = np.searchsorted(cum, cum[j] - overlap_words, side="right") - 1
+            if k < i:
+                k = i
+        else:
+            k = j
         # next start = end - overlap_paras (but not less than previous start + 1 to ensure progress)
-        i = max(start_idx + 1, end_idx_excl - overlap_paras)
-    return spans
+        i = max(i + 1, k)
+    return starts[:m], ends[:m]
+
+def chunk_by_paragraph_index(all_paras, target_words=TARGET_WORDS, overlap_words=OVERLAP_WORDS):
+    """
+    Greedy pack paragraphs into chunks and return a list of (start_idx, end_idx) pairs,
+    where indices refer to all_paras. Overlap is applied in paragraph units so indices
+    stay consistent.
+    """
+    word_counts = np.array([word_count(p) for p in all_paras], dtype=np.int32)
+    starts, ends = pack_spans(word_counts, target_words, overlap_words)
+    return [(int(s), int(e)) for s, e in zip(starts, ends)]
 
 def main():
     if not PDF_PATH.exists():
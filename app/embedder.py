@@ -0,0 +1,155 @@
+# app/embedder.py
+"""
+Sentence embedder used by build_index.py and answer_with_citations.py.
+
+- load_embedder() returns an int8-quantized ONNX Runtime MiniLM if it has been
+  exported (and onnxruntime + tokenizers are installed), else the regular
+  PyTorch SentenceTransformer. Both expose the same .encode() subset.
+- One-time export + dynamic int8 (per-channel) quantization, needs `optimum`:
+    python -m app.embedder --export
+  (equivalent to `optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 ...`
+   followed by ORTQuantizer with an avx512_vnni dynamic config)
+
+Rebuild the index after exporting so chunk and query vectors come from the same model.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+from pathlib import Path
+from typing import List, Union
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+MODEL_NAME = "all-MiniLM-L6-v2"
+HF_MODEL_ID = f"sentence-transformers/{MODEL_NAME}"
+ONNX_DIR = ROOT / "processed" / "onnx" / MODEL_NAME
+ONNX_FILE = "model_qint8.onnx"
+MAX_SEQ_LEN = 256  # same as the sentence-transformers config for MiniLM-L6
+
+
+def onnx_available(model_dir: Path = ONNX_DIR) -> bool:
+    # find_spec, not import: keeps onnxruntime's import cost off CLI start-up (and off cache hits)
+    return ((model_dir / ONNX_FILE).exists()
+            and importlib.util.find_spec("onnxruntime") is not None
+            and importlib.util.find_spec("tokenizers") is not None)
+
+
+class OnnxEmbedder:
+    """Mean-pooled, optionally L2-normalized MiniLM embeddings via ONNX Runtime (CPU)."""
+
+    def __init__(self, model_dir: Path = ONNX_DIR, model_file: str = ONNX_FILE, max_length: int = MAX_SEQ_LEN):
+        import onnxruntime as ort  # type: ignore
+        from tokenizers import Tokenizer  # type: ignore
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        pad_id = self.tokenizer.token_to_id("[PAD]") or 0
+        self.tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")  # pad to longest in batch
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(model_dir / model_file), sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.output_name = self.session.get_outputs()[0].name
+        self._dim = None
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dim is None:
+            self._dim = int(self.encode(["dimension probe"]).shape[1])
+        return self._dim
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        out = []
+        for i in range(0, len(sentences), batch_size):
+            enc = self.tokenizer.encode_batch(list(sentences[i:i + batch_size]))
+            ids = np.array([e.ids for e in enc], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in enc], dtype=np.int64)
+            feed = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self.input_names:
+                feed["token_type_ids"] = np.zeros_like(ids)
+            hidden = self.session.run([self.output_name], feed)[0]  # (B, T, D)
+
+            # mean pooling over real tokens
+            m = mask[..., None].astype(np.float32)
+            vecs = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+            if normalize_embeddings:
+                vecs /= np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+            out.append(vecs.astype(np.float32, copy=False))
+
+        embs = np.vstack(out) if out else np.empty((0, 0), dtype=np.float32)
+        return embs[0] if single else embs
+
+
+def embedder_id(model_name: str = MODEL_NAME) -> str:
+    """Name of the backend load_embedder() would pick (for cache keys), without loading it."""
+    return f"{model_name}+onnx-qint8" if onnx_available() else model_name
+
+
+def ensure_fast_tokenizer(model, model_id: str = HF_MODEL_ID):
+    """Swap in the Rust (`tokenizers`-backed) HF tokenizer if the model loaded a slow Python one."""
+    tok = getattr(model, "tokenizer", None)
+    if tok is None or getattr(tok, "is_fast", True):
+        return model  # already fast (the usual case for MiniLM)
+    try:
+        from transformers import AutoTokenizer  # type: ignore
+        model.tokenizer = AutoTokenizer.from_pretrained(model_id, use_fast=True)
+    except Exception:
+        pass  # no tokenizer.json available → keep the slow one
+    return model
+
+
+def load_embedder(model_name: str = MODEL_NAME):
+    if onnx_available():
+        return OnnxEmbedder()
+    from sentence_transformers import SentenceTransformer
+    model_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    return ensure_fast_tokenizer(SentenceTransformer(model_name), model_id)
+
+
+def export_onnx(model_id: str = HF_MODEL_ID, out_dir: Path = ONNX_DIR) -> Path:
+    """Export MiniLM to ONNX and write a dynamic int8 (per-channel) quantized copy."""
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer  # type: ignore
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig  # type: ignore
+    from transformers import AutoTokenizer  # type: ignore
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    model = ORTModelForFeatureExtraction.from_pretrained(model_id, export=True)
+    model.save_pretrained(out_dir)
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(out_dir)  # writes tokenizer.json
+
+    quantizer = ORTQuantizer.from_pretrained(model)
+    qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=True)
+    quantizer.quantize(save_dir=out_dir, quantization_config=qconfig, file_suffix="qint8")
+    return out_dir / ONNX_FILE
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--export", action="store_true", help="export + int8-quantize MiniLM to ONNX")
+    args = ap.parse_args()
+
+    if args.export:
+        path = export_onnx()
+        print(f"✅ Wrote quantized ONNX model → {path}")
+        print("👉 Now rebuild the vector index:\n    python -m app.build_index")
+    else:
+        print(f"Backend: {embedder_id()}  (ONNX dir: {ONNX_DIR})")
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,46 @@
 # app/formatting.py
+from pathlib import Path
+from typing import Dict, List, Optional
 import re
 
+import numpy as np
+
+from app.io_utils import file_stamp
+
 TOC_HINTS = {"table of contents", "exhibit", "index of", "item 1."}
 MIN_SENT_LEN = 40    # skip super-short heading lines
 MAX_SENT_LEN = 350   # avoid overly long rambles
 
+# compiled once; these run on every retrieved chunk
+_HYPH_RE = re.compile(r"-\s*\n\s*")
+_WS_RE = re.compile(r"[ \t]+")
+_NL_RE = re.compile(r"\n{3,}")
+_ABBR_RE = re.compile(r"(?:\b[A-Z]\.){2,}")
+_SENT_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"[a-zA-Z]{3,}")
+
+# int.bit_count is Python 3.10+
+_popcount = getattr(int, "bit_count", None) or (lambda x: bin(x).count("1"))
+
 def normalize(text: str) -> str:
     # collapse spaces, keep newlines meaningful
     t = text.replace("\xa0", " ")
     # join hyphenated line-breaks like "informa-\ntion" -> "information"
-    t = re.sub(r"-\s*\n\s*", "", t)
+    t = _HYPH_RE.sub("", t)
     # turn single newlines inside paragraphs into spaces; keep blank lines as paragraph breaks
-    t = re.sub(r"[ \t]+", " ", t)
-    t = re.sub(r"\n{3,}", "\n\n", t)
+    t = _WS_RE.sub(" ", t)
+    t = _NL_RE.sub("\n\n", t)
     return t.strip()
 
+def _protect_abbr(m) -> str:
+    return m.group(0).replace(".", "∯")
+
 def split_sentences(text: str):
     # very simple sentence splitter
     text = normalize(text)
     # protect abbreviations a bit: "U.S." etc
-    text = re.sub(r"(\b[A-Z]\.){2,}", lambda m: m.group(0).replace(".", "∯"), text)
-    parts = re.split(r"(?<=[.!?])\s+", text)
+    text = _ABBR_RE.sub(_protect_abbr, text)
+    parts = _SENT_SPLIT_RE.split(text)
     sents = [s.replace("∯", ".").strip() for s in parts if s.strip()]
     # length filter
     sents = [s for s in sents if MIN_SENT_LEN <= len(s) <= MAX_SENT_LEN]
@@ -30,28 +50,138 @@ def looks_like_toc(text: str) -> bool:
     t = text.lower()
     return any(h in t for h in TOC_HINTS)
 
-def keyword_score(query: str, sentence: str) -> int:
-    q_words = {w.lower() for w in re.findall(r"[a-zA-Z]{3,}", query)}
-    s_words = {w.lower() for w in re.findall(r"[a-zA-Z]{3,}", sentence)}
-    return len(q_words & s_words)
+def query_terms(query: str) -> dict:
+    """
+    Lower-cased query words, each mapped to its own bit (1, 2, 4, ...).
+    Build once per question and pass to best_sentences().
+    """
+    q_bits = {}
+    for w in _WORD_RE.findall(query):
+        q_bits.setdefault(w.lower(), 1 << len(q_bits))
+    return q_bits
 
-def best_sentences(query: str, chunk_text: str, max_sentences: int = 2):
-    """Return up to N sentences from the chunk that best match query words, skipping TOC-like lines."""
-    if looks_like_toc(chunk_text):
-        return []
+def _bag(q_bits: dict, sentence: str) -> int:
+    # OR of the bits of the query words present in the sentence; one bit per word,
+    # so unlike a hashed bag there are no collisions and the count is exact
+    bag = 0
+    get = q_bits.get
+    for w in _WORD_RE.findall(sentence):
+        bag |= get(w.lower(), 0)
+    return bag
 
-    sents = split_sentences(chunk_text)
+def _score(q_bits: dict, sentence: str) -> int:
+    # number of distinct query words in the sentence == popcount of its bag
+    return _popcount(_bag(q_bits, sentence))
+
+def keyword_score(query: str, sentence: str) -> int:
+    return _score(query_terms(query), sentence)
+
+def pick_sentences(q_terms: dict, sents: List[str], max_sentences: int = 2) -> List[str]:
+    """Up to N already-split sentences that best match the query terms (see best_sentences)."""
     if not sents:
         return []
 
     # score each sentence by keyword overlap
-    scored = [(keyword_score(query, s), i, s) for i, s in enumerate(sents)]
-    # prefer higher score; stable by original order
-    scored.sort(key=lambda x: (-x[0], x[1]))
+    n = len(sents)
+    scores = np.fromiter((_score(q_terms, s) for s in sents), dtype=np.int64, count=n)
 
     # if no keyword overlap at all, fallback to first 1–2 clean sentences
-    if scored[0][0] == 0:
+    if scores.max() == 0:
         return sents[:max_sentences]
 
-    picked = [s for _, _, s in scored[:max_sentences]]
+    # prefer higher score; ties by original order — folded into one distinct key,
+    # so an O(n) argpartition + a sort of the k winners replaces the full sort
+    key = scores * n - np.arange(n)
+    k = min(max_sentences, n)
+    top = np.argpartition(-key, k - 1)[:k] if k < n else np.arange(n)
+    top = top[np.argsort(-key[top])]
+    picked = [sents[i] for i in top]
     return picked
+
+def best_sentences(query: str, chunk_text: str, max_sentences: int = 2, q_terms: dict = None):
+    """Return up to N sentences from the chunk that best match query words, skipping TOC-like lines."""
+    if looks_like_toc(chunk_text):
+        return []
+
+    if q_terms is None:
+        q_terms = query_terms(query)
+    return pick_sentences(q_terms, split_sentences(chunk_text), max_sentences)
+
+# ---- precomputed split/TOC flags (processed/chunk_aux.npz, written by build_index) ----
+def build_chunk_aux(texts: List[str]) -> Dict[str, np.ndarray]:
+    """
+    split_sentences() + looks_like_toc() for every chunk, as flat arrays:
+      toc          (N,) bool
+      chunk_sents  (N+1,) int64  sentences of chunk i are [chunk_sents[i], chunk_sents[i+1])
+      sent_ends    (S,) int64    end offset of each sentence in sent_bytes
+      sent_bytes   (B,) uint8    all sentences, UTF-8, concatenated
+    TOC chunks get no sentences (best_sentences() never looks at them).
+    """
+    toc = np.fromiter((looks_like_toc(t) for t in texts), dtype=bool, count=len(texts))
+    blobs, sent_ends, chunk_sents = [], [], [0]
+    pos = 0
+    for t, is_toc in zip(texts, toc):
+        if not is_toc:
+            for sent in split_sentences(t):
+                b = sent.encode("utf-8")
+                blobs.append(b)
+                pos += len(b)
+                sent_ends.append(pos)
+        chunk_sents.append(len(sent_ends))
+    return {
+        "toc": toc,
+        "chunk_sents": np.asarray(chunk_sents, dtype=np.int64),
+        "sent_ends": np.asarray(sent_ends, dtype=np.int64),
+        "sent_bytes": np.frombuffer(b"".join(blobs), dtype=np.uint8),
+    }
+
+def save_chunk_aux(path: Path, texts: List[str], chunks_stamp: str) -> None:
+    """Write build_chunk_aux(texts), tagged with file_stamp() of the chunks.jsonl they came from."""
+    np.savez(str(path), stamp=np.array(chunks_stamp), **build_chunk_aux(texts))
+
+class ChunkAux:
+    """Read side of chunk_aux.npz, indexed by chunk id (== FAISS id)."""
+
+    def __init__(self, toc, chunk_sents, sent_ends, sent_bytes):
+        self.toc = np.asarray(toc, dtype=bool)
+        self.chunk_sents = np.asarray(chunk_sents, dtype=np.int64)
+        self.sent_ends = np.asarray(sent_ends, dtype=np.int64)
+        self.blob = np.asarray(sent_bytes, dtype=np.uint8).tobytes()
+
+    def __len__(self) -> int:
+        return len(self.toc)
+
+    def is_toc(self, i: int) -> bool:
+        return bool(self.toc[i])
+
+    def sentences(self, i: int) -> List[str]:
+        a, b = int(self.chunk_sents[i]), int(self.chunk_sents[i + 1])
+        if a == b:
+            return []
+        ends = self.sent_ends[a:b].tolist()
+        starts = [int(self.sent_ends[a - 1]) if a else 0] + ends[:-1]
+        return [self.blob[s:e].decode("utf-8") for s, e in zip(starts, ends)]
+
+def load_chunk_aux(path: Path, chunks_path: Path, n_chunks: int) -> Optional[ChunkAux]:
+    """ChunkAux if the file exists and was built from the current chunks.jsonl, else None (split on the fly)."""
+    if not path.exists():
+        return None
+    try:
+        with np.load(str(path)) as z:
+            if str(z["stamp"]) != file_stamp(chunks_path):
+                return None  # chunks.jsonl changed since build_index (or a pre-stamp file)
+            aux = ChunkAux(z["toc"], z["chunk_sents"], z["sent_ends"], z["sent_bytes"])
+    except Exception:
+        return None
+    if len(aux) != n_chunks:
+        return None
+    return aux
+
+def chunk_sentences(q_terms: dict, chunk_text: str, max_sentences: int = 2,
+                    aux: Optional[ChunkAux] = None, idx: int = -1) -> List[str]:
+    """best_sentences() for chunk `idx`, from the precomputed split when `aux` is available."""
+    if aux is None or idx < 0:
+        return best_sentences("", chunk_text, max_sentences, q_terms=q_terms)
+    if aux.is_toc(idx):
+        return []
+    return pick_sentences(q_terms, aux.sentences(idx), max_sentences)
@@ -10,6 +10,11 @@ Outputs under:
     - source.html|.txt|.pdf       (primary document)
     - meta.json                   (cik, ticker, form, filingDate, accession, urls)
     - filing_index.json           (list of documents in the filing)
+
+HTTP:
+  - one keep-alive requests.Session (urllib fallback if requests isn't installed)
+  - with --limit > 1, up to SEC_MAX_WORKERS filings download concurrently;
+    request starts are still spaced SEC_REQUEST_DELAY apart across all threads
 """
 
 from __future__ import annotations
@@ -17,6 +22,9 @@ import os
 import time
 import json
 import argparse
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 import urllib.request
@@ -30,11 +38,52 @@ try:
 except Exception:
     pass
 
+# Optional keep-alive HTTP client
+try:
+    import requests  # type: ignore
+except Exception:
+    requests = None
+
 RAW_DIR = ROOT / "data" / "raw" / "sec"
 USER_AGENT = os.getenv("SEC_USER_AGENT", "FinancialDocAssistant (contact@example.com)")
 REQ_DELAY = float(os.getenv("SEC_REQUEST_DELAY", "0.4"))
+MAX_WORKERS = int(os.getenv("SEC_MAX_WORKERS", "4"))
+
+if requests is not None:
+    _SESSION = requests.Session()
+    _SESSION.headers.update({"User-Agent": USER_AGENT})
+    _SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=MAX_WORKERS))
+else:
+    _SESSION = None
+
+
+class _RateLimiter:
+    """Space request starts at least `interval` seconds apart, across threads."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+_LIMITER = _RateLimiter(REQ_DELAY)
+
+# relative links in the EDGAR directory listing (skip "?sort" and "/Archives/..." links)
+_HREF_RE = re.compile(rb'href="([^"?/][^"]*)"', re.IGNORECASE)
 
 def _http_get(url: str, accept: str = "application/json") -> bytes:
+    _LIMITER.wait()
+    if _SESSION is not None:
+        resp = _SESSION.get(url, headers={"Accept": accept}, timeout=45)
+        resp.raise_for_status()
+        return resp.content
     req = urllib.request.Request(
         url,
         headers={"User-Agent": USER_AGENT, "Accept": accept},
@@ -47,22 +96,72 @@ def _http_get_json(url: str) -> Any:
     data = _http_get(url, accept="application/json")
     return json.loads(data.decode("utf-8", errors="replace"))
 
-def _http_get_text(url: str) -> str:
-    data = _http_get(url, accept="text/html, text/plain, */*")
-    return data.decode("utf-8", errors="replace")
-
 def _save_bytes(path: Path, content: bytes) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_bytes(content)
 
-def _save_text(path: Path, content: str) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(content, encoding="utf-8")
-
 def _save_json(path: Path, obj: Any) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(json.dumps(obj, indent=2), encoding="utf-8")
 
+def _fetch_filing(ticker: str, cik: str, form: str, accn: str, date: str, pdoc: str) -> Optional[Path]:
+    """Download one filing into data/raw/sec/<TICKER>/<ACCESSION>/; None if nothing downloadable."""
+    accession = accn.replace("/", "")  # e.g., 0000320193-23-000106
+    # build archive base
+    # NOTE: SEC uses folders: data/<CIK without leading zeros>/<ACCESSION no dashes>/
+    cik_no_zeros = str(int(cik))
+    accn_nodash = accession.replace("-", "")
+    base = f"https://www.sec.gov/Archives/edgar/data/{cik_no_zeros}/{accn_nodash}/"
+
+    # download index page to list docs
+    index_url = base  # listing directory renders an HTML index
+    index_bytes = _http_get(index_url, accept="text/html, text/plain, */*")
+
+    # best effort find all hrefs (one regex pass over the raw bytes)
+    hrefs = [m.group(1).decode("utf-8", errors="replace") for m in _HREF_RE.finditer(index_bytes)]
+
+    # choose primary document (from submissions metadata)
+    primary_doc_url = base + pdoc
+    # fetch primary document bytes
+    try:
+        primary_bytes = _http_get(primary_doc_url, accept="*/*")
+    except Exception:
+        # as a fallback, try first HTML/TXT in hrefs
+        cand = next((h for h in hrefs if h.lower().endswith((".htm", ".html", ".txt", ".pdf"))), None)
+        if not cand:
+            print(f"⚠️ No downloadable doc found for {ticker} {form} {accession}")
+            return None
+        primary_doc_url = base + cand
+        primary_bytes = _http_get(primary_doc_url, accept="*/*")
+
+    # write to disk
+    out_dir = RAW_DIR / ticker.upper() / accession
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # source filename based on extension
+    ext = ".html"
+    low = primary_doc_url.lower()
+    if low.endswith(".txt"):
+        ext = ".txt"
+    elif low.endswith(".pdf"):
+        ext = ".pdf"
+
+    _save_bytes(out_dir / f"source{ext}", primary_bytes)
+    _save_bytes(out_dir / "filing_index.html", index_bytes)
+    _save_json(out_dir / "filing_index.json", {"hrefs": hrefs})
+    _save_json(out_dir / "meta.json", {
+        "ticker": ticker.upper(),
+        "cik": cik,
+        "form": form,
+        "filingDate": date,
+        "accession": accession,
+        "archiveBaseUrl": base,
+        "primaryDocument": primary_doc_url,
+        "downloadedAt": time.time(),
+        "userAgent": USER_AGENT,
+    })
+    return out_dir
+
 def fetch_latest(ticker: str, form: str = "10-K", limit: int = 1) -> List[Path]:
     """
     Fetch latest `limit` filings of `form` for `ticker`.
@@ -75,91 +174,30 @@ def fetch_latest(ticker: str, form: str = "10-K", limit: int = 1) -> List[Path]:
     # 1) submissions API
     subs_url = f"https://data.sec.gov/submissions/CIK{cik}.json"
     subs = _http_get_json(subs_url)
-    time.sleep(REQ_DELAY)
 
-    # 2) filter recent filings
+    # 2) filter recent filings (newest first)
     recent = subs.get("filings", {}).get("recent", {})
     forms = recent.get("form", [])
     accns = recent.get("accessionNumber", [])
     dates = recent.get("filingDate", [])
     primary_docs = recent.get("primaryDocument", [])
+    candidates = [(accn, date, pdoc) for form_i, accn, date, pdoc in zip(forms, accns, dates, primary_docs)
+                  if form_i == form]
 
+    # 3) download in waves of the still-missing count; a filing with nothing
+    #    downloadable is skipped and the next candidate takes its slot
     out_dirs: List[Path] = []
-    picked = 0
-
-    for form_i, accn, date, pdoc in zip(forms, accns, dates, primary_docs):
-        if form_i != form:
-            continue
-        accession = accn.replace("/", "")  # e.g., 0000320193-23-000106
-        # 3) build archive base
-        # NOTE: SEC uses folders: data/<CIK without leading zeros>/<ACCESSION no dashes>/
-        cik_no_zeros = str(int(cik))
-        accn_nodash = accession.replace("-", "")
-        base = f"https://www.sec.gov/Archives/edgar/data/{cik_no_zeros}/{accn_nodash}/"
-
-        # 4) download index page to list docs
-        index_url = base  # listing directory renders an HTML index
-        index_html = _http_get_text(index_url)
-        time.sleep(REQ_DELAY)
-
-        # best effort find all hrefs (simple scrape)
-        hrefs = []
-        for line in index_html.splitlines():
-            line = line.strip()
-            # crude anchor extraction
-            if 'href="' in line.lower():
-                start = line.lower().find('href="') + 6
-                end = line.find('"', start)
-                if end > start:
-                    href = line[start:end]
-                    if href and not href.startswith("?") and not href.startswith("/"):
-                        hrefs.append(href)
-
-        # 5) choose primary document (from submissions metadata)
-        primary_doc_url = base + pdoc
-        # fetch primary document bytes
-        try:
-            primary_bytes = _http_get(primary_doc_url, accept="*/*")
-        except Exception:
-            # as a fallback, try first HTML/TXT in hrefs
-            cand = next((h for h in hrefs if h.lower().endswith((".htm", ".html", ".txt", ".pdf"))), None)
-            if not cand:
-                print(f"⚠️ No downloadable doc found for {ticker} {form} {accession}")
-                continue
-            primary_doc_url = base + cand
-            primary_bytes = _http_get(primary_doc_url, accept="*/*")
-
-        # 6) write to disk
-        out_dir = RAW_DIR / ticker.upper() / accession
-        out_dir.mkdir(parents=True, exist_ok=True)
-
-        # source filename based on extension
-        ext = ".html"
-        low = primary_doc_url.lower()
-        if low.endswith(".txt"):
-            ext = ".txt"
-        elif low.endswith(".pdf"):
-            ext = ".pdf"
-
-        _save_bytes(out_dir / f"source{ext}", primary_bytes)
-        _save_text(out_dir / "filing_index.html", index_html)
-        _save_json(out_dir / "filing_index.json", {"hrefs": hrefs})
-        _save_json(out_dir / "meta.json", {
-            "ticker": ticker.upper(),
-            "cik": cik,
-            "form": form,
-            "filingDate": date,
-            "accession": accession,
-            "archiveBaseUrl": base,
-            "primaryDocument": primary_doc_url,
-            "downloadedAt": time.time(),
-            "userAgent": USER_AGENT,
-        })
-
-        out_dirs.append(out_dir)
-        picked += 1
-        if picked >= limit:
-            break
+    pos = 0
+    while len(out_dirs) < limit and pos < len(candidates):
+        wave = candidates[pos:pos + (limit - len(out_dirs))]
+        pos += len(wave)
+        workers = max(1, min(MAX_WORKERS, len(wave)))
+        if workers == 1:
+            results = [_fetch_filing(ticker, cik, form, *c) for c in wave]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                results = list(ex.map(lambda c: _fetch_filing(ticker, cik, form, *c), wave))
+        out_dirs.extend(d for d in results if d is not None)
 
     return out_dirs
 
@@ -9,7 +9,8 @@ Inputs (from previous steps):
 
 Outputs:
   processed/chunks.jsonl (appended)
-  # Then run your existing: python app/build_index.py  (to refresh FAISS)
+  processed/chunks.ids   (sidecar: ids already in chunks.jsonl, for dedup)
+  # Then run your existing: python -m app.build_index  (to refresh FAISS)
 
 Usage:
   # index a specific accession
@@ -22,25 +23,30 @@ Usage:
 from __future__ import annotations
 from pathlib import Path
 import json
+import os
 import argparse
 import re
 from typing import List, Dict, Tuple, Optional
 
+from app.io_utils import dumps_line, file_stamp, loads_line
+
 # project root: app/ingest/sec_index.py -> parents[2]
 ROOT = Path(__file__).resolve().parents[2]
 RAW_DIR = ROOT / "data" / "raw" / "sec"
 INTERIM_DIR = ROOT / "data" / "interim" / "sec"
 PROCESSED_DIR = ROOT / "processed"
 CHUNKS_PATH = PROCESSED_DIR / "chunks.jsonl"
+IDS_PATH = PROCESSED_DIR / "chunks.ids"
 
 def _most_recent_accession(ticker: str) -> str:
     base = INTERIM_DIR / ticker.upper()
     if not base.exists():
         raise SystemExit(f"No interim filings for ticker {ticker}")
-    dirs = [d for d in base.iterdir() if d.is_dir()]
-    if not dirs:
+    # scandir: is_dir() comes from the dirent type, stat() is cached per entry
+    with os.scandir(base) as it:
+        latest = max((e for e in it if e.is_dir()), key=lambda e: e.stat().st_mtime, default=None)
+    if latest is None:
         raise SystemExit(f"No accession folders under {base}")
-    latest = max(dirs, key=lambda p: p.stat().st_mtime)
     return latest.name
 
 def _read_meta(ticker: str, accession: str) -> dict:
@@ -116,17 +122,27 @@ def _make_doc_name(meta: dict) -> str:
 
 # inside app/ingest/sec_index.py
 
+# records are written with "id" as the first key (compact or json.dumps spacing)
+_ID_PREFIXES = (b'{"id":"', b'{"id": "')
+
 def _load_existing_ids(path: Path) -> set:
     ids = set()
     if not path.exists():
         return ids
-    with path.open("r", encoding="utf-8") as f:
+    loads = loads_line
+    with path.open("rb") as f:
         for line in f:
             line = line.strip()
             if not line:
                 continue
+            # fast path: slice the id out without parsing the whole record
+            if line.startswith(_ID_PREFIXES):
+                _id = line.split(b'"', 4)[3]
+                if _id and b"\\" not in _id:
+                    ids.add(_id.decode("utf-8"))
+                    continue
             try:
-                obj = json.loads(line)
+                obj = loads(line)
                 _id = obj.get("id")
                 if _id:
                     ids.add(_id)
@@ -134,15 +150,40 @@ def _load_existing_ids(path: Path) -> set:
                 continue
     return ids
 
+def _load_id_sidecar(chunks_path: Path, ids_path: Path) -> Optional[set]:
+    """
+    Ids from the sidecar (header line "#<size>:<mtime_ns>" of chunks.jsonl, then one id
+    per line). Returns None if it is missing or chunks.jsonl changed since it was written.
+    """
+    if not ids_path.exists() or not chunks_path.exists():
+        return None
+    with ids_path.open("r", encoding="utf-8") as f:
+        if f.readline().strip() != f"#{file_stamp(chunks_path)}":
+            return None
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+def _write_id_sidecar(ids: set, chunks_path: Path, ids_path: Path) -> None:
+    tmp = ids_path.with_name(ids_path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(f"#{file_stamp(chunks_path)}\n")
+        f.writelines(f"{_id}\n" for _id in sorted(ids))
+    os.replace(tmp, ids_path)  # atomic: readers never see a half-written sidecar
+
 def _append_chunks_dedup(chunks: List[dict]) -> int:
     CHUNKS_PATH.parent.mkdir(parents=True, exist_ok=True)
-    existing = _load_existing_ids(CHUNKS_PATH)
+    existing = _load_id_sidecar(CHUNKS_PATH, IDS_PATH)
+    fresh = existing is None
+    if fresh:
+        # first run, or chunks.jsonl was rewritten elsewhere: one full scan
+        existing = _load_existing_ids(CHUNKS_PATH)
     to_write = [rec for rec in chunks if rec.get("id") not in existing]
-    if not to_write:
-        return 0
-    with CHUNKS_PATH.open("a", encoding="utf-8") as f:
-        for rec in to_write:
-            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    if to_write:
+        with CHUNKS_PATH.open("ab") as f:
+            for rec in to_write:
+                f.write(dumps_line(rec))
+        existing.update(rec["id"] for rec in to_write if rec.get("id"))
+    if (to_write or fresh) and CHUNKS_PATH.exists():
+        _write_id_sidecar(existing, CHUNKS_PATH, IDS_PATH)
     return len(to_write)
 
 def index_one(ticker: str, accession: str) -> int:
@@ -188,7 +229,7 @@ def main():
 
     accession = args.accession or _most_recent_accession(args.ticker)
     index_one(args.ticker, accession)
-    print("👉 Now rebuild the vector index:\n    python app/build_index.py")
+    print("👉 Now rebuild the vector index:\n    python -m app.build_index")
 
 if __name__ == "__main__":
     main()
@@ -20,8 +20,12 @@ Usage:
 from __future__ import annotations
 from pathlib import Path
 from typing import List, Dict, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import io
 import json
+import mmap
 import argparse
+import os
 import re
 
 # project root: app/ingest/sec_parse.py -> parents[2]
@@ -29,12 +33,26 @@ ROOT = Path(__file__).resolve().parents[2]
 RAW_DIR = ROOT / "data" / "raw" / "sec"
 INTERIM_DIR = ROOT / "data" / "interim" / "sec"
 
+# PDF pages are extracted independently, so long filings fan out over processes
+PDF_MAX_WORKERS = min(os.cpu_count() or 1, 6)
+PDF_PARALLEL_MIN_PAGES = 16   # below this, process start-up costs more than it saves
+
 # Optional HTML parser
 try:
     from bs4 import BeautifulSoup  # type: ignore
 except Exception:
     BeautifulSoup = None
 
+# lxml (libxml2, C): parses and walks the tree natively; several times faster than
+# BeautifulSoup on multi-MB 10-K HTML. BeautifulSoup is the fallback.
+try:
+    import lxml.html as lxml_html  # type: ignore
+except Exception:
+    lxml_html = None
+
+# Tree builder for the BeautifulSoup fallback
+BS_PARSER = "lxml" if lxml_html is not None else "html.parser"
+
 # PDF parser
 try:
     from pypdf import PdfReader  # type: ignore
@@ -42,22 +60,61 @@ except Exception:
     PdfReader = None
 
 
+# compiled once; these run over multi-MB filing text
+_WS_SPACE = re.compile(r"[ \t]+")
+_WS_NL = re.compile(r"\n{3,}")
+# trailing whitespace (anything str.rstrip() drops, e.g. \u2009, \u3000) + any line
+# break str.splitlines() knows → "\n"
+_TRAIL_WS = re.compile(r"[^\S\n\r\v\f\x1c-\x1e\x85\u2028\u2029]*(?:\r\n|[\n\r\v\f\x1c-\x1e\x85\u2028\u2029])")
+
+
 def _clean_whitespace(text: str) -> str:
     # normalize whitespace, keep paragraph breaks
     t = text.replace("\xa0", " ")
     # collapse runs of spaces/tabs
-    t = re.sub(r"[ \t]+", " ", t)
+    t = _WS_SPACE.sub(" ", t)
+    # strip trailing spaces per line (and normalize line breaks to \n)
+    t = _TRAIL_WS.sub("\n", t)
     # collapse 3+ newlines to at most 2
-    t = re.sub(r"\n{3,}", "\n\n", t)
-    # strip trailing spaces per line
-    t = "\n".join(line.rstrip() for line in t.splitlines())
+    t = _WS_NL.sub("\n\n", t)
     return t.strip()
 
 
+# pre-parse trimming: only <body> is text we keep, and inline-XBRL headers / CSS /
+# scripts are a large share of a 10-K's bytes
+_BODY_RE = re.compile(r"<body[^>]*>(.*)</body\s*>", re.I | re.S)
+_HEAVY_RE = re.compile(r"<(script|style|noscript|ix:header)\b[^>]*>.*?</\1\s*>", re.I | re.S)
+
+
+def _trim_html(html: str) -> str:
+    m = _BODY_RE.search(html)
+    body = m.group(1) if m else html
+    # an empty comment, not "" or " ": no text of its own, but the text on either side
+    # stays two separate nodes, exactly as if the parser had removed the element
+    return _HEAVY_RE.sub("<!---->", body)
+
+
+def _html_text_lxml(html: str) -> str:
+    root = lxml_html.fragment_fromstring(html, create_parent="div")
+    # drop_tree() keeps each node's tail text, like BeautifulSoup's extract()
+    for node in root.xpath("//script|//style|//noscript"):
+        node.drop_tree()
+    # same text-node join as soup.get_text("\n"), but the traversal runs in C;
+    # comments/PIs stay in the tree: itertext() skips their text but, like
+    # get_text(), still yields the text on either side as separate strings
+    return "\n".join(root.itertext())
+
+
 def _extract_text_html(html: str) -> str:
+    html = _trim_html(html)  # smaller input → fewer nodes for the tree builder
+    if lxml_html is not None:
+        try:
+            return _clean_whitespace(_html_text_lxml(html))
+        except Exception:
+            pass  # empty / malformed input lxml refuses → BeautifulSoup below
     if BeautifulSoup is not None:
-        soup = BeautifulSoup(html, "html.parser")
-        # remove script/style
+        soup = BeautifulSoup(html, BS_PARSER)
+        # remove script/style (safety net for anything the trim regex missed)
         for tag in soup(["script", "style", "noscript"]):
             tag.extract()
         text = soup.get_text("\n")
@@ -73,32 +130,85 @@ def _extract_text_txt(txt: str) -> str:
     return _clean_whitespace(txt)
 
 
+def _page_text(page) -> str:
+    try:
+        return page.extract_text() or ""
+    except Exception:
+        return ""
+
+
+# Page separator for the single cleaning pass: not whitespace, so none of the
+# _clean_whitespace patterns can match across it
+_PAGE_SEP = "\x00"
+
+
+def _clean_pages(raw_pages: List[str]) -> List[str]:
+    """_clean_whitespace() of every page, as one pass over the joined text."""
+    if not raw_pages:
+        return []
+    if any(_PAGE_SEP in t for t in raw_pages):
+        return [_clean_whitespace(t) for t in raw_pages]  # separator unusable
+    cleaned = _clean_whitespace(_PAGE_SEP.join(raw_pages)).split(_PAGE_SEP)
+    return [t.strip() for t in cleaned]  # the per-page part of strip()
+
+
+def _open_pdf(pdf_path: Path) -> "PdfReader":
+    # one bulk mmap read into memory; pypdf's many small seek+read calls while walking
+    # the xref/object tree then hit a BytesIO instead of the buffered file
+    with open(pdf_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return PdfReader(f)  # mmap can't map an empty file; let pypdf raise its own error
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = io.BytesIO(mm)  # copies, so the map can close right away
+    return PdfReader(data)
+
+
+# each worker process opens a given PDF once and reuses the reader for its pages
+_PDF_READERS: Dict[str, "PdfReader"] = {}
+
+
+def _extract_one_page(pdf_path: Path, i: int) -> Tuple[int, str]:
+    """Worker: (page index, raw text) for one page."""
+    key = str(pdf_path)
+    reader = _PDF_READERS.get(key)
+    if reader is None:
+        reader = _PDF_READERS[key] = _open_pdf(pdf_path)
+    return i, _page_text(reader.pages[i])
+
+
 def _extract_text_pdf(pdf_path: Path) -> Tuple[str, List[Dict]]:
     if PdfReader is None:
         raise SystemExit("pypdf not installed. Please `pip install pypdf`.")
 
-    reader = PdfReader(str(pdf_path))
-    pages = []
+    pages = _open_pdf(pdf_path).pages  # hoisted: one lazy page list for count + serial walk
+    n = len(pages)
+    if PDF_MAX_WORKERS <= 1 or n < PDF_PARALLEL_MIN_PAGES:
+        texts = [_page_text(page) for page in pages]
+    else:
+        with ProcessPoolExecutor(max_workers=PDF_MAX_WORKERS) as ex:
+            results = list(ex.map(_extract_one_page, [pdf_path] * n, range(n),
+                                  chunksize=max(1, n // (PDF_MAX_WORKERS * 4))))
+        results.sort(key=lambda r: r[0])
+        texts = [ptxt for _, ptxt in results]
+    texts = _clean_pages(texts)
+
+    # offsets in one serial pass, in page order
+    page_map = []
     out_lines = []
     offset = 0
 
-    for i, page in enumerate(reader.pages, start=1):
-        try:
-            ptxt = page.extract_text() or ""
-        except Exception:
-            ptxt = ""
-        ptxt = _clean_whitespace(ptxt)
+    for i, ptxt in enumerate(texts, start=1):
         if ptxt:
             out_lines.append(ptxt)
             start = offset
             offset += len(ptxt) + 1  # +1 for the newline we’ll join with
-            pages.append({"page": i, "start": start, "end": offset})
+            page_map.append({"page": i, "start": start, "end": offset})
         else:
             # even if page blank, record a small span so mapping stays monotonic
-            pages.append({"page": i, "start": offset, "end": offset})
+            page_map.append({"page": i, "start": offset, "end": offset})
 
     full_text = "\n".join(out_lines).strip()
-    return full_text, pages
+    return full_text, page_map
 
 
 def parse_one(ticker: str, accession: str) -> Path:
@@ -155,10 +265,11 @@ def _most_recent_accession(ticker: str) -> str:
     if not base.exists():
         raise SystemExit(f"No raw filings for ticker {ticker}")
     # pick the folder with the newest modified time
-    dirs = [d for d in base.iterdir() if d.is_dir()]
-    if not dirs:
+    # (scandir: is_dir() comes from the dirent type, stat() is cached per entry)
+    with os.scandir(base) as it:
+        latest = max((e for e in it if e.is_dir()), key=lambda e: e.stat().st_mtime, default=None)
+    if latest is None:
         raise SystemExit(f"No accession folders under {base}")
-    latest = max(dirs, key=lambda p: p.stat().st_mtime)
     return latest.name
 
 
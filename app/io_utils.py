@@ -0,0 +1,87 @@
+# app/io_utils.py
+"""
+JSONL reading/writing shared by the query CLIs (qa_cli, search_query,
+answer_with_citations) and the writers (build_index, ingest.sec_index).
+
+- loads_line() / dumps_line(): one JSONL record from / to UTF-8 bytes, with
+  orjson when installed (stdlib json otherwise).
+- file_stamp(): size + mtime marker used to invalidate derived files/caches.
+- load_jsonl(): mmap the file and parse line by line with orjson
+  (stdlib json if orjson isn't installed).
+- load_jsonl_cached(): same result, but keeps a pickle of the parsed list next
+  to the file (chunks.jsonl → chunks.pkl), stamped with the source's size +
+  mtime; later CLI starts unpickle it and skip JSON parsing entirely.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Optional fast JSON (bytes in/out); stdlib json is the fallback
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None
+
+PICKLE_PROTOCOL = 5
+
+loads_line = orjson.loads if orjson is not None else json.loads  # both accept UTF-8 bytes
+
+
+def dumps_line(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj) + b"\n"
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def load_jsonl(path: Path) -> List[Dict]:
+    loads = loads_line
+    items = []
+    with path.open("rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return items  # mmap can't map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            readline = mm.readline
+            line = readline()
+            while line:
+                line = line.strip()
+                if line:
+                    items.append(loads(line))
+                line = readline()
+    return items
+
+
+def file_stamp(path: Path) -> str:
+    """Cheap change marker for a file: "<size>:<mtime_ns>"."""
+    st = path.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def load_jsonl_cached(path: Path, cache_path: Optional[Path] = None) -> List[Dict]:
+    """load_jsonl() through a pickle cache that is rebuilt whenever the JSONL changes."""
+    cache_path = cache_path or path.with_suffix(".pkl")
+    stamp = file_stamp(path)
+
+    if cache_path.exists():
+        try:
+            with cache_path.open("rb") as f:
+                if pickle.load(f) == stamp:  # stamp first: a stale cache costs one tiny read
+                    return pickle.load(f)
+        except Exception:
+            pass  # corrupt / other Python version → rebuild
+
+    items = load_jsonl(path)
+    tmp = cache_path.with_suffix(".pkl.tmp")
+    try:
+        with tmp.open("wb") as f:
+            pickle.dump(stamp, f, protocol=PICKLE_PROTOCOL)
+            pickle.dump(items, f, protocol=PICKLE_PROTOCOL)
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass  # cache is best-effort
+    return items
@@ -1,23 +1,78 @@
 # app/macro_utils.py
 from pathlib import Path
-import pandas as pd
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import math
+import os
 
 ROOT = Path(__file__).resolve().parents[1]
 MACRO_DIR = ROOT / "data" / "macro"
 
+TAIL_BYTES = 4096   # first read from the end of the CSV; grows until enough rows
+YOY_PERIODS = 12    # monthly series
+
+def _parse_row(line: bytes, di: int, vi: int):
+    parts = line.split(b",")
+    if len(parts) <= max(di, vi):
+        return None
+    date, raw = parts[di].strip(), parts[vi].strip()
+    if not date or not raw:
+        return None  # missing observation (pandas dropna)
+    try:
+        value = float(raw)
+    except ValueError:
+        return None
+    if math.isnan(value):
+        return None
+    return date.decode("ascii", "replace")[:10], value
+
+def _tail_rows(path: Path, n: int) -> List[Tuple[str, float]]:
+    """Last n complete (date, value) rows, read from the end of the file."""
+    with path.open("rb") as f:
+        header = [h.strip().strip(b'"').lower() for h in f.readline().split(b",")]
+        di, vi = header.index(b"date"), header.index(b"value")
+        body_start = f.tell()
+        size = f.seek(0, os.SEEK_END)
+
+        block = TAIL_BYTES
+        while True:
+            start = max(body_start, size - block)
+            f.seek(start)
+            lines = f.read(size - start).splitlines()
+            if start > body_start:
+                lines = lines[1:]  # first line is probably cut mid-row
+            rows: List[Tuple[str, float]] = []
+            for line in lines:
+                row = _parse_row(line, di, vi)
+                if row is not None:
+                    rows.append(row)
+            if len(rows) >= n or start == body_start:
+                return rows[-n:]
+            block *= 4
+
+@lru_cache(maxsize=32)
+def _load(series: str, mtime_ns: int) -> Dict:
+    """Everything the CLIs ask about one series, from a single tail read; cached per file version."""
+    rows = _tail_rows(MACRO_DIR / f"{series}.csv", YOY_PERIODS + 1)
+    if not rows:
+        raise IndexError(f"No observations in {series}.csv")
+    date, v = rows[-1]
+    yoy = float("nan")  # not enough history (pct_change gives NaN)
+    if len(rows) > YOY_PERIODS and rows[0][1] != 0:
+        yoy = (v / rows[0][1] - 1) * 100
+    return {"latest_date": date, "latest_value": v, "latest_yoy": yoy}
+
+def _series(series: str) -> Dict:
+    # mtime in the key: a re-fetched CSV is a cache miss, no explicit invalidation
+    mt = (MACRO_DIR / f"{series}.csv").stat().st_mtime_ns
+    return _load(series, mt)
+
 def latest_value(series: str):
     """Return latest date + value from a macro CSV (raw level)."""
-    path = MACRO_DIR / f"{series}.csv"
-    df = pd.read_csv(path, parse_dates=["date"])
-    df = df.dropna()
-    latest = df.iloc[-1]
-    return latest["date"].strftime("%Y-%m-%d"), latest["value"]
+    d = _series(series)
+    return d["latest_date"], d["latest_value"]
 
 def latest_yoy(series: str):
     """Return latest date + YoY % change."""
-    path = MACRO_DIR / f"{series}.csv"
-    df = pd.read_csv(path, parse_dates=["date"])
-    df = df.dropna()
-    df["yoy"] = df["value"].pct_change(periods=12) * 100
-    latest = df.iloc[-1]
-    return latest["date"].strftime("%Y-%m-%d"), latest["yoy"]
+    d = _series(series)
+    return d["latest_date"], d["latest_yoy"]
@@ -3,7 +3,9 @@
 Tiny Ollama client used by qa_cli.py
 
 - Exposes: generate_with_ollama(prompt, model=None, options=None, timeout=60) -> str
-- Uses only urllib (no extra deps)
+           stream_with_ollama(...)  -> iterator of response pieces as they are generated
+- One keep-alive requests.Session, so REPL turns reuse the TCP connection
+  (plain urllib, a new connection per call, if requests isn't installed)
 - Reads defaults from environment:
     OLLAMA_URL   (default: http://localhost:11434)
     OLLAMA_MODEL (default: qwen2.5:3b-instruct)
@@ -15,11 +17,34 @@ import json
 import os
 import urllib.request
 import urllib.error
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator
+
+# Optional: keep-alive HTTP
+try:
+    import requests  # type: ignore
+except Exception:
+    requests = None
 
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
 DEFAULT_MODEL = os.getenv("OLLAMA_MODEL", "qwen2.5:3b-instruct")
 
+if requests is not None:
+    _SESSION = requests.Session()
+    _SESSION.headers["Content-Type"] = "application/json"
+else:
+    _SESSION = None
+
+
+def _payload(prompt: str, model: Optional[str], options: Optional[Dict[str, Any]], stream: bool) -> bytes:
+    payload = {
+        "model": model or DEFAULT_MODEL,
+        "prompt": prompt,
+        "stream": stream,
+    }
+    if options:
+        payload["options"] = options
+    return json.dumps(payload).encode("utf-8")
+
 
 def generate_with_ollama(
     prompt: str,
@@ -31,15 +56,16 @@ def generate_with_ollama(
     Send a non-streaming /api/generate request to Ollama and return the response text.
     Returns "" on error (qa_cli.py will fall back to stitched text).
     """
-    payload = {
-        "model": model or DEFAULT_MODEL,
-        "prompt": prompt,
-        "stream": False,
-    }
-    if options:
-        payload["options"] = options
+    data = _payload(prompt, model, options, stream=False)
+    if _SESSION is not None:
+        try:
+            r = _SESSION.post(f"{OLLAMA_URL}/api/generate", data=data, timeout=timeout)
+            r.raise_for_status()
+            return (r.json().get("response") or "").strip()
+        except Exception:
+            # server not running / network issue
+            return ""
 
-    data = json.dumps(payload).encode("utf-8")
     req = urllib.request.Request(
         f"{OLLAMA_URL}/api/generate",
         data=data,
@@ -59,6 +85,49 @@ def generate_with_ollama(
         return ""
 
 
+def stream_with_ollama(
+    prompt: str,
+    model: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None,
+    timeout: int = 60,
+) -> Iterator[str]:
+    """
+    Streaming /api/generate: yields response text pieces as Ollama produces them
+    (one JSON object per line). Yields nothing on error, and simply stops if the
+    connection drops mid-answer.
+    """
+    data = _payload(prompt, model, options, stream=True)
+    try:
+        if _SESSION is not None:
+            with _SESSION.post(f"{OLLAMA_URL}/api/generate", data=data, timeout=timeout, stream=True) as r:
+                r.raise_for_status()
+                yield from _iter_pieces(r.iter_lines())
+        else:
+            req = urllib.request.Request(
+                f"{OLLAMA_URL}/api/generate",
+                data=data,
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                yield from _iter_pieces(resp)
+    except Exception:
+        # server not running / network issue
+        return
+
+
+def _iter_pieces(lines) -> Iterator[str]:
+    for line in lines:
+        if not line.strip():
+            continue
+        obj = json.loads(line)
+        piece = obj.get("response") or ""
+        if piece:
+            yield piece
+        if obj.get("done"):
+            break
+
+
 if __name__ == "__main__":
     # quick self-test
     out = generate_with_ollama("Say 'hello' and stop.", options={"temperature": 0.2, "num_ctx": 2048})
@@ -2,27 +2,37 @@
 from __future__ import annotations
 
 from pathlib import Path
-import json
+from contextlib import nullcontext
+from functools import lru_cache
 import re
 from typing import List, Tuple, Optional, Dict
 
-import faiss
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
-from app.formatting import best_sentences
+# Optional: Aho–Corasick automaton for issuer alias matching
+try:
+    import ahocorasick  # type: ignore
+except Exception:
+    ahocorasick = None
+
+from app.embedder import load_embedder
+from app.io_utils import load_jsonl_cached
+from app.vector_index import EMB_PATH, filtered_search, load_embeddings, read_faiss_index
+from app.formatting import chunk_sentences, load_chunk_aux, query_terms
 from app.macro_utils import latest_value, latest_yoy
-from app.text_utils import build_vocab_from_chunks, autocorrect_query
+from app.text_utils import build_vocab_counts, build_speller, autocorrect_query
 from app.rag_prompt import build_rag_prompt
-from app.ollama_client import generate_with_ollama
+from app.ollama_client import stream_with_ollama
 
 ROOT = Path(__file__).resolve().parents[1]
 INDEX_PATH = ROOT / "processed" / "vectors.faiss"
 META_PATH = ROOT / "processed" / "chunk_meta.jsonl"  # (not used but kept for parity)
 CHUNKS_PATH = ROOT / "processed" / "chunks.jsonl"
+AUX_PATH = ROOT / "processed" / "chunk_aux.npz"     # precomputed sentence splits (optional)
 
 MODEL_NAME = "all-MiniLM-L6-v2"
 TOP_K = 5
-CAND_K = TOP_K * 8          # pull wider, then filter by issuer/year
+CAND_K = TOP_K * 8          # per search; issuer and year hints each get their own filtered search
 GOOD_SCORE = 0.30
 
 # ---- deterministic pre-replacements (word-boundary) ----
@@ -42,26 +52,41 @@ ISSUER_ALIASES = {
     # add more as you ingest more issuers
 }
 
+def _build_alias_automaton():
+    """All aliases of all issuers in one automaton: a single pass over the query finds every hit."""
+    if ahocorasick is None:
+        return None
+    owners: Dict[str, set] = {}
+    for ticker, aliases in ISSUER_ALIASES.items():
+        for a in aliases:
+            owners.setdefault(a, set()).add(ticker)
+    A = ahocorasick.Automaton()
+    for a, tickers in owners.items():
+        A.add_word(a, tuple(sorted(tickers)))
+    A.make_automaton()
+    return A
+
+_ALIAS_AC = _build_alias_automaton()
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+
+# all patterns in one alternation: named group k{i} is PRE_REPLACEMENTS' i-th pattern
+# (named, so capturing groups inside a pattern don't shift the numbering)
+_PRE_RE = re.compile("|".join(f"(?P<k{i}>{pat})" for i, pat in enumerate(PRE_REPLACEMENTS)),
+                     flags=re.IGNORECASE)
+_PRE_REPL = list(PRE_REPLACEMENTS.values())
+
 def apply_pre_replacements(q: str) -> tuple[str, dict]:
     changes = {}
-    new_q = q
-    for pat, repl in PRE_REPLACEMENTS.items():
-        matches = list(re.finditer(pat, new_q, flags=re.IGNORECASE))
-        if matches:
-            new_q = re.sub(pat, repl, new_q, flags=re.IGNORECASE)
-            for m in matches:
-                orig = m.group(0)
-                if orig not in changes and orig.lower() != repl.lower():
-                    changes[orig] = repl
-    return new_q, changes
 
-def load_jsonl(p: Path):
-    out = []
-    with p.open("r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                out.append(json.loads(line))
-    return out
+    def _sub(m):
+        orig = m.group(0)
+        repl = _PRE_REPL[int(m.lastgroup[1:])]
+        if orig not in changes and orig.lower() != repl.lower():
+            changes[orig] = repl
+        return repl
+
+    new_q = _PRE_RE.sub(_sub, q)  # one scan instead of finditer + sub per pattern
+    return new_q, changes
 
 # ---- Macro intent detection (simple) ----
 def try_answer_macro(q: str):
@@ -84,12 +109,16 @@ def try_answer_macro(q: str):
 def parse_requested_issuers_and_year(q: str) -> Tuple[set, Optional[int]]:
     ql = q.lower()
     wanted = set()
-    for ticker, aliases in ISSUER_ALIASES.items():
-        if any(a in ql for a in aliases):
-            wanted.add(ticker)
+    if _ALIAS_AC is not None:
+        for _, tickers in _ALIAS_AC.iter(ql):
+            wanted.update(tickers)
+    else:
+        for ticker, aliases in ISSUER_ALIASES.items():
+            if any(a in ql for a in aliases):
+                wanted.add(ticker)
     # detect a 4-digit year between 1990 and 2100
     year = None
-    m = re.search(r"\b(19|20)\d{2}\b", q)
+    m = _YEAR_RE.search(q)
     if m:
         try:
             y = int(m.group(0))
@@ -99,65 +128,148 @@ def parse_requested_issuers_and_year(q: str) -> Tuple[set, Optional[int]]:
             pass
     return wanted, year
 
-def get_field(c: Dict, key: str, default=None):
-    return c.get(key, default)
-
-def prefer_by_filters(ids: List[int], scores: List[float], chunks: List[Dict], issuers: set, year: Optional[int]) -> List[int]:
+def _as_year(v) -> int:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return -1  # unknown year never matches a requested one (1990–2100)
+
+def build_filter_arrays(chunks: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """Issuer / year per chunk id as two flat arrays, so filtering never touches the chunk dicts."""
+    issuer_arr = np.array([c.get("issuer") or "" for c in chunks], dtype=str)
+    year_arr = np.array([_as_year(c.get("year")) for c in chunks], dtype=np.int16)
+    return issuer_arr, year_arr
+
+def build_issuer_ids(issuer_arr: np.ndarray) -> Dict[str, np.ndarray]:
+    """Chunk ids per issuer, for the FAISS IDSelector."""
+    return {t: np.flatnonzero(issuer_arr == t) for t in np.unique(issuer_arr).tolist() if t}
+
+def _merge_hits(parts) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenate (scores, ids) search results into one best-first list, without -1 pads or duplicates."""
+    scores = np.concatenate([sc[0] for sc, _ in parts])
+    ids = np.concatenate([ii[0] for _, ii in parts])
+    keep = ids >= 0
+    scores, ids = scores[keep], ids[keep]
+    order = np.argsort(-scores, kind="stable")
+    scores, ids = scores[order], ids[order]
+    _, first = np.unique(ids, return_index=True)  # an id may come from several searches
+    first.sort()
+    return scores[first], ids[first]
+
+def retrieve(index, q_vec: np.ndarray, issuers: set, issuer_ids: Dict[str, np.ndarray],
+             year: Optional[int] = None, year_arr: Optional[np.ndarray] = None,
+             embs: Optional[np.ndarray] = None):
+    """
+    Candidate (scores, ids) for q_vec, best first. Each requested issuer gets its own
+    IDSelector-filtered search, so no candidate slot goes to another issuer and every
+    issuer has CAND_K candidates to interleave; unfiltered if none of them is indexed.
+    A requested year adds one more search restricted to that year's chunks (of the
+    requested issuers, if any), so prefer_by_filters has matching-year chunks to promote.
+    A filtered search that finds fewer than TOP_K hits is redone exactly over its allowed
+    ids (rows of `embs` when given). Scores are those of the filtered hits, so the caller's
+    GOOD_SCORE check applies to the best hit within the hints, not over the whole index.
+    """
+    groups = [issuer_ids[t] for t in sorted(issuers) if t in issuer_ids]
+    if groups:
+        parts = [filtered_search(index, q_vec, CAND_K, g, TOP_K, embs) for g in groups]
+    else:
+        parts = [index.search(q_vec, CAND_K)]
+    if year is not None and year_arr is not None:
+        year_ids = np.flatnonzero(year_arr == year)
+        if groups:
+            year_ids = np.intersect1d(year_ids, np.concatenate(groups), assume_unique=True)
+        if year_ids.size:
+            parts.append(filtered_search(index, q_vec, CAND_K, year_ids, TOP_K, embs))
+    scores, ids = _merge_hits(parts)
+    if groups and ids.size == 0:
+        return retrieve(index, q_vec, set(), issuer_ids, year, year_arr, embs)
+    return scores, ids
+
+def prefer_by_filters(ids, scores, issuer_arr: np.ndarray, year_arr: np.ndarray,
+                      issuers: set, year: Optional[int]) -> List[int]:
     """
     Re-rank/filter a wider candidate list to honor issuer/year hints.
     Strategy:
-      - if issuers specified, keep only those whose chunk['issuer'] ∈ issuers
+      - if issuers specified, keep only those whose issuer ∈ issuers
         (but if that empties, fall back to originals)
-      - if year specified, prefer matching year (stable sort boost)
+      - if year specified, prefer matching year (stable: keeps score order within each group)
       - if multiple issuers, interleave so each gets representation
+    `ids` arrive in score order; `scores` is kept for call-site parity.
     """
-    pairs = [(i, s) for i, s in zip(ids, scores) if i >= 0]
+    ids = np.asarray(ids, dtype=np.int64)
+    ids = ids[ids >= 0]
     # issuer filter
     if issuers:
-        filt = [(i, s) for (i, s) in pairs if get_field(chunks[i], "issuer") in issuers]
-        if filt:  # only apply if we still have candidates
-            pairs = filt
+        mask = np.isin(issuer_arr[ids], list(issuers))
+        if mask.any():  # only apply if we still have candidates
+            ids = ids[mask]
 
-    if not pairs:
+    if ids.size == 0:
         return []
 
-    # year preference: stable boost
+    # year preference: matching year first, stable
     if year is not None:
-        prefers = []
-        others = []
-        for i, s in pairs:
-            if get_field(chunks[i], "year") == year:
-                prefers.append((i, s + 1e-3))  # tiny boost
-            else:
-                others.append((i, s))
-        pairs = prefers + others
+        ids = ids[np.argsort(year_arr[ids] != year, kind="stable")]
 
     # if multiple issuers requested, interleave to balance
     if len(issuers) >= 2:
-        buckets: Dict[str, List[Tuple[int, float]]] = {}
-        for i, s in pairs:
-            key = get_field(chunks[i], "issuer")
-            buckets.setdefault(key, []).append((i, s))
+        keys = issuer_arr[ids]
+        buckets: Dict[str, List[int]] = {t: ids[keys == t].tolist() for t in np.unique(keys)}
         # round-robin draw
         out: List[int] = []
         while len(out) < TOP_K and any(buckets.values()):
             for tick in sorted(buckets.keys()):
                 if buckets[tick]:
-                    out.append(buckets[tick].pop(0)[0])
+                    out.append(buckets[tick].pop(0))
                     if len(out) == TOP_K:
                         break
         return out
 
     # otherwise, take top_k by score order
-    out = [i for i, _ in pairs[:TOP_K]]
-    return out
+    return ids[:TOP_K].tolist()
+
+# ---- query embedding ----
+def prepare_model(model):
+    """
+    fp16 + GPU when CUDA is available (half precision only pays off there);
+    returns (model, context manager to run encode() under).
+    """
+    try:
+        import torch  # type: ignore
+    except Exception:
+        return model, nullcontext  # ONNX-only install
+    if isinstance(model, torch.nn.Module) and torch.cuda.is_available():
+        model = model.half().to("cuda")
+    return model, torch.inference_mode
+
+def make_embedder(model, maxsize: int = 256, warmup: bool = True):
+    """Memoized query → (1, D) float32 vector; REPL repeats skip the model entirely."""
+    model, ctx = prepare_model(model)
+
+    def encode(text: str):
+        with ctx():
+            return model.encode([text], normalize_embeddings=True,
+                                convert_to_numpy=True, show_progress_bar=False)
+
+    if warmup:
+        encode("warm-up")  # lazy init (kernels, allocator, ORT session) before the first real question
+
+    @lru_cache(maxsize=maxsize)
+    def embed(text: str) -> np.ndarray:
+        v = encode(text)
+        v = np.asarray(v, dtype=np.float32)  # fp32 at the FAISS boundary
+        v.flags.writeable = False  # shared by every cache hit
+        return v
+
+    return embed
 
 # ---- RAG answer stitching (for non-LLM fallback and citations preview) ----
-def format_answer(ids, scores, chunks, query: str):
+def format_answer(ids, scores, chunks, query: str, aux=None):
     used = 0
     cites = []
     stitched_bits = []
     seen_pages = set()
+    q_terms = query_terms(query)  # tokenize the question once, not per sentence
     for idx, sc in zip(ids, scores):
         if idx < 0:
             continue
@@ -166,7 +278,8 @@ def format_answer(ids, scores, chunks, query: str):
         if page_sig in seen_pages:
             continue
         seen_pages.add(page_sig)
-        sentences = best_sentences(query, c.get("text",""), max_sentences=2 if used == 0 else 1)
+        sentences = chunk_sentences(q_terms, c.get("text",""), max_sentences=2 if used == 0 else 1,
+                                    aux=aux, idx=int(idx))
         if not sentences:
             continue
         stitched_bits.extend(sentences)
@@ -178,16 +291,41 @@ def format_answer(ids, scores, chunks, query: str):
     stitched = " ".join(stitched_bits)[:600]
     return stitched, cites
 
+def stream_answer(prompt: str) -> str:
+    """
+    Print the LLM answer token by token as it arrives; returns the full (stripped) text.
+    Nothing is printed if the model returns nothing, so the caller can fall back.
+    """
+    parts: List[str] = []
+    for piece in stream_with_ollama(prompt):
+        if not parts:
+            piece = piece.lstrip()
+            if not piece:
+                continue  # leading whitespace: wait for real text before the header
+            print("\nAssistant: ", end="", flush=True)
+        parts.append(piece)
+        print(piece, end="", flush=True)
+    if parts:
+        print()
+    return "".join(parts).strip()
+
 def main():
     if not INDEX_PATH.exists() or not CHUNKS_PATH.exists():
         print("❌ Missing index/chunks. Build index first.")
         return
 
-    index = faiss.read_index(str(INDEX_PATH))
-    chunks = load_jsonl(CHUNKS_PATH)
+    index = read_faiss_index(INDEX_PATH)  # HNSW efSearch / IVF nprobe set for us
+    embs = load_embeddings(EMB_PATH) if EMB_PATH.exists() else None  # exact fallback for short filtered searches
+    chunks = load_jsonl_cached(CHUNKS_PATH)  # chunks.pkl after the first start
+    issuer_arr, year_arr = build_filter_arrays(chunks)
+    issuer_ids = build_issuer_ids(issuer_arr)
+    aux = load_chunk_aux(AUX_PATH, CHUNKS_PATH, len(chunks))  # None → split sentences on the fly
 
-    vocab = build_vocab_from_chunks(chunks)
-    model = SentenceTransformer(MODEL_NAME)
+    vocab_counts = build_vocab_counts(chunks)
+    vocab_list = sorted(vocab_counts)      # difflib fallback candidates, built once
+    vocab_set = frozenset(vocab_counts)
+    speller = build_speller(vocab_counts)  # None → difflib fallback
+    embed = make_embedder(load_embedder(MODEL_NAME))
 
     print("Type a question. Type 'exit' to quit.\n")
     while True:
@@ -200,7 +338,7 @@ def main():
 
         # deterministic fixes + fuzzy autocorrect
         pre_q, pre_changes = apply_pre_replacements(q)
-        fixed_q, changed, corr = autocorrect_query(pre_q, vocab)
+        fixed_q, changed, corr = autocorrect_query(pre_q, vocab_list, vocab_set, speller=speller)
         if pre_changes or changed:
             merged = {**pre_changes, **corr}
             print(f"(did you mean: {fixed_q}  — corrected {list(merged.items())})")
@@ -218,17 +356,16 @@ def main():
         # issuer/year hints
         wanted_issuers, wanted_year = parse_requested_issuers_and_year(q_use)
 
-        # embed & retrieve wider candidate pool
-        q_vec = model.encode([q_use], normalize_embeddings=True).astype("float32")
-        scores_all, ids_all = index.search(q_vec, CAND_K)
-        scores_all, ids_all = scores_all[0], ids_all[0]
+        # embed & retrieve (issuer/year hints filter inside the FAISS search)
+        q_vec = embed(q_use)
+        scores_all, ids_all = retrieve(index, q_vec, wanted_issuers, issuer_ids, wanted_year, year_arr, embs)
 
         if len(ids_all) == 0 or ids_all[0] < 0 or scores_all[0] < GOOD_SCORE:
             print("Assistant: 🤔 Insufficient context in the indexed filings. Try rephrasing or add more docs.\n")
             continue
 
         # apply issuer/year preferences
-        chosen_ids = prefer_by_filters(list(ids_all), list(scores_all), chunks, wanted_issuers, wanted_year)
+        chosen_ids = prefer_by_filters(ids_all, scores_all, issuer_arr, year_arr, wanted_issuers, wanted_year)
         if not chosen_ids:
             chosen_ids = list(ids_all[:TOP_K])
 
@@ -245,11 +382,11 @@ def main():
 
         # compose RAG prompt with formatting awareness
         prompt = build_rag_prompt(q_use, contexts)
-        llm_answer = generate_with_ollama(prompt).strip()
+        llm_answer = stream_answer(prompt)
 
         # if the model gave nothing, fall back to stitched sentences
         if not llm_answer:
-            stitched, cites = format_answer(chosen_ids, scores_all, chunks, q_use)
+            stitched, cites = format_answer(chosen_ids, scores_all, chunks, q_use, aux)
             if not stitched:
                 print("Assistant: 🤔 Insufficient context.\n")
                 continue
@@ -260,8 +397,7 @@ def main():
             print(f"\n[confidence ~ {scores_all[0]:.3f}]\n")
             continue
 
-        # Print LLM answer and synthetic “Sources” block from our chosen chunks
-        print("\nAssistant:", llm_answer)
+        # LLM answer was printed while streaming; add a synthetic “Sources” block from our chosen chunks
         print("\nSources:")
         # try to label each distinct doc once; keep order
         seen = set()
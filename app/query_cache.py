@@ -0,0 +1,146 @@
+# app/query_cache.py
+"""
+Persistent query-embedding + retrieval cache for the one-shot CLIs.
+
+Layout (processed/query_cache/):
+  cache_index.json   entries keyed by sha256(model + query): matrix row, LRU tick,
+                     cached top-k ids/scores, and the index signature they belong to
+  cache_vecs.npy     (rows, D) float32 query embeddings, row-aligned with the entries
+
+Lookup order:
+  1) exact hit  — same query text: reuse embedding (skips model load + encode)
+                  and the cached top-k if the index hasn't changed
+  2) soft hit   — after encoding, a cached query with cosine ≥ SOFT_HIT_SCORE:
+                  reuse its top-k (skips the search)
+Least-recently-used entries are evicted beyond MAX_ENTRIES.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.io_utils import file_stamp
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = ROOT / "processed" / "query_cache"
+
+MAX_ENTRIES = 1000
+SOFT_HIT_SCORE = 0.97
+
+
+def file_signature(path: Path, *extra) -> str:
+    """Cheap identity for an index file (size + mtime) plus any search settings."""
+    parts = [path.name, file_stamp(path)] + [str(x) for x in extra]
+    return ":".join(parts)
+
+
+class QueryCache:
+    def __init__(self, model_name: str, index_sig: str, cache_dir: Path = CACHE_DIR,
+                 max_entries: int = MAX_ENTRIES, soft_hit: float = SOFT_HIT_SCORE):
+        self.model_name = model_name
+        self.index_sig = index_sig
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.soft_hit = soft_hit
+        self.index_path = cache_dir / "cache_index.json"
+        self.vecs_path = cache_dir / "cache_vecs.npy"
+
+        self.entries: Dict[str, Dict] = {}
+        self.vecs: Optional[np.ndarray] = None
+        self.tick = 0
+        self._load()
+
+    # ---- persistence ----
+    def _load(self) -> None:
+        if not self.index_path.exists() or not self.vecs_path.exists():
+            return
+        try:
+            obj = json.loads(self.index_path.read_text(encoding="utf-8"))
+            vecs = np.load(str(self.vecs_path))
+        except Exception:
+            return  # corrupt cache → start fresh
+        if obj.get("model") != self.model_name:
+            return
+        self.entries = obj.get("entries") or {}
+        self.tick = int(obj.get("tick", 0))
+        self.vecs = np.array(vecs, dtype=np.float32)
+        if obj.get("index_sig") != self.index_sig:
+            # index rebuilt: embeddings are still valid, results are not
+            for e in self.entries.values():
+                e["ids"] = None
+                e["scores"] = None
+
+    def _save(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        obj = {
+            "model": self.model_name,
+            "index_sig": self.index_sig,
+            "tick": self.tick,
+            "entries": self.entries,
+        }
+        tmp_idx = self.index_path.with_suffix(".json.tmp")
+        tmp_vecs = self.vecs_path.with_suffix(".tmp.npy")
+        tmp_idx.write_text(json.dumps(obj), encoding="utf-8")
+        np.save(str(tmp_vecs), self.vecs)
+        os.replace(tmp_vecs, self.vecs_path)
+        os.replace(tmp_idx, self.index_path)
+
+    # ---- lookups ----
+    def _key(self, query: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{query}".encode("utf-8")).hexdigest()
+
+    def _hit(self, e: Dict) -> Dict:
+        e["t"] = self.tick = self.tick + 1
+        ids = None if e.get("ids") is None else np.asarray(e["ids"], dtype=np.int64)
+        scores = None if e.get("scores") is None else np.asarray(e["scores"], dtype=np.float32)
+        return {"vec": self.vecs[e["row"]], "ids": ids, "scores": scores}
+
+    def get(self, query: str) -> Optional[Dict]:
+        """Exact hit → {"vec", "ids", "scores"} (ids/scores None if stale), else None."""
+        e = self.entries.get(self._key(query))
+        if e is None or self.vecs is None:
+            return None
+        return self._hit(e)
+
+    def similar(self, q_vec: np.ndarray) -> Optional[Dict]:
+        """Soft hit: cached query with cosine ≥ soft_hit that still has valid results."""
+        live = [e for e in self.entries.values() if e.get("ids") is not None]
+        if not live or self.vecs is None:
+            return None
+        rows = np.array([e["row"] for e in live], dtype=np.int64)
+        sims = self.vecs[rows] @ np.asarray(q_vec, dtype=np.float32).reshape(-1)
+        best = int(np.argmax(sims))
+        if sims[best] < self.soft_hit:
+            return None
+        return self._hit(live[best])
+
+    def put(self, query: str, q_vec: np.ndarray, ids, scores) -> None:
+        q_vec = np.asarray(q_vec, dtype=np.float32).reshape(-1)
+        key = self._key(query)
+        e = self.entries.get(key)
+        if e is None:
+            if self.vecs is None or self.vecs.shape[1] != q_vec.shape[0]:
+                self.vecs = np.empty((0, q_vec.shape[0]), dtype=np.float32)
+                self.entries = {}
+            if len(self.entries) >= self.max_entries:
+                # evict least-recently-used, reuse its matrix row
+                old_key = min(self.entries, key=lambda k: self.entries[k]["t"])
+                row = self.entries.pop(old_key)["row"]
+            else:
+                row = self.vecs.shape[0]
+                self.vecs = np.vstack([self.vecs, np.zeros((1, q_vec.shape[0]), dtype=np.float32)])
+            e = self.entries[key] = {"row": row}
+        self.vecs[e["row"]] = q_vec
+        e["ids"] = [int(i) for i in ids]
+        e["scores"] = [float(s) for s in scores]
+        e["t"] = self.tick = self.tick + 1
+        try:
+            self._save()
+        except OSError:
+            pass  # cache is best-effort
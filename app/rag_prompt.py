@@ -1,7 +1,21 @@
 # app/rag_prompt.py
+from functools import lru_cache
 from typing import List, Dict, Tuple, Optional
 import re
 
+# cut a context chunk at the last sentence end before the limit, unless that
+# would keep less than this share of the limit (then hard-cut as before)
+SENTENCE_CUT_MIN = 0.6
+
+# style inference: compiled / built once, not per prompt
+_COUNT_RE1 = re.compile(r"(top|give me|list|into|in|show|summarize|provide)\s+(\d{1,2})")
+_COUNT_RE2 = re.compile(r"\b(\d{1,2})\s+(bullets?|points?|items?|numbered|sentences?)\b")
+_TOPN_RE = re.compile(r"\b(top\s+\d+)\b")
+_BULLET_HINTS = ("bullet", "bulleted", "bullet points", "points", "as a list")
+_NUMBERED_HINTS = ("numbered", "1.", "2.", "3.")
+_LINES_HINTS = ("each on a new line", "separate lines", "new line", "new lines", "line by line")
+
+@lru_cache(maxsize=256)
 def _infer_style_and_count(question: str) -> Tuple[str, Optional[int]]:
     """
     Infer desired output style from the user's question.
@@ -13,7 +27,7 @@ def _infer_style_and_count(question: str) -> Tuple[str, Optional[int]]:
     # try to detect an explicit count
     n = None
     # common phrasings: "top 5", "give me 3", "list 4", "in 3 sentences"
-    m = re.search(r"(top|give me|list|into|in|show|summarize|provide)\s+(\d{1,2})", q)
+    m = _COUNT_RE1.search(q)
     if m:
         try:
             n = int(m.group(2))
@@ -21,7 +35,7 @@ def _infer_style_and_count(question: str) -> Tuple[str, Optional[int]]:
             n = None
     else:
         # "3 bullets", "3 points", "3 numbered", "3 sentences"
-        m2 = re.search(r"\b(\d{1,2})\s+(bullets?|points?|items?|numbered|sentences?)\b", q)
+        m2 = _COUNT_RE2.search(q)
         if m2:
             try:
                 n = int(m2.group(1))
@@ -29,12 +43,12 @@ def _infer_style_and_count(question: str) -> Tuple[str, Optional[int]]:
                 n = None
 
     # style hints
-    if any(k in q for k in ["bullet", "bulleted", "bullet points", "points", "as a list"]) or q.startswith("list "):
+    if any(k in q for k in _BULLET_HINTS) or q.startswith("list "):
         return "bullets", n
-    if any(k in q for k in ["numbered", "1.", "2.", "3."]) or re.search(r"\b(top\s+\d+)\b", q):
+    if any(k in q for k in _NUMBERED_HINTS) or _TOPN_RE.search(q):
         # treat "top N" as numbered if not explicitly bullets
         return "numbered", n
-    if any(k in q for k in ["each on a new line", "separate lines", "new line", "new lines", "line by line"]):
+    if any(k in q for k in _LINES_HINTS):
         return "lines", n
     # fallback
     return "prose", n
@@ -92,6 +106,17 @@ def _format_instruction(style: str, n: Optional[int]) -> str:
     )
 
 
+def _truncate_at_sentence(text: str, limit: int) -> str:
+    """text[:limit], pulled back to the last '. ' so the LLM never sees half a sentence."""
+    if len(text) <= limit:
+        return text
+    head = text[:limit + 1]  # +1: a period right at the limit still counts
+    cut = max(head.rfind(". "), head.rfind(".\n"))
+    if cut + 1 >= SENTENCE_CUT_MIN * limit:
+        return head[:cut + 1]
+    return text[:limit]
+
+
 def build_rag_prompt(question: str, contexts: List[Dict], max_chars_per_chunk: int = 1200) -> str:
     """
     Build a retrieval-augmented prompt with strict formatting control.
@@ -107,7 +132,7 @@ def build_rag_prompt(question: str, contexts: List[Dict], max_chars_per_chunk: i
     # 1) Prepare context block
     items = []
     for i, c in enumerate(contexts, start=1):
-        snippet = (c.get("text") or "")[:max_chars_per_chunk]
+        snippet = _truncate_at_sentence(c.get("text") or "", max_chars_per_chunk)
         snippet = snippet.replace("\n", " ").strip()
         items.append(f"[{i}] (Doc: {c.get('doc','?')}, pages {c.get('page_start','?')}-{c.get('page_end','?')})\n{snippet}")
     ctx_block = "\n\n".join(items)
@@ -1,9 +1,10 @@
 # app/search_query.py
 from pathlib import Path
-import json
-import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from app.embedder import load_embedder
+from app.io_utils import load_jsonl_cached
+from app.vector_index import read_faiss_index
 
 ROOT = Path(__file__).resolve().parents[1]
 INDEX_PATH = ROOT / "processed" / "vectors.faiss"
@@ -12,26 +13,18 @@ META_PATH = ROOT / "processed" / "chunk_meta.jsonl"
 MODEL_NAME = "all-MiniLM-L6-v2"   # same model as build_index.py
 TOP_K = 3
 
-def load_meta(meta_path: Path):
-    meta = []
-    with meta_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                meta.append(json.loads(line))
-    return meta
-
 def main():
     if not INDEX_PATH.exists() or not META_PATH.exists():
-        print("❌ Missing index or metadata. Run app/build_index.py first.")
+        print("❌ Missing index or metadata. Run `python -m app.build_index` first.")
         return
 
     # 1) load index + metadata
-    index = faiss.read_index(str(INDEX_PATH))
-    meta = load_meta(META_PATH)
+    index = read_faiss_index(INDEX_PATH)  # HNSW/IVF search knobs applied
+    meta = load_jsonl_cached(META_PATH)
     dim = index.d  # vector dimension
 
     # 2) load embedding model
-    model = SentenceTransformer(MODEL_NAME)
+    model = load_embedder(MODEL_NAME)
 
     # 3) ask user for a query
     query = input("Your question: ").strip()
@@ -39,7 +32,7 @@ def main():
         print("No query provided.")
         return
 
-    # 4) embed query (normalized to match IndexFlatIP)
+    # 4) embed query (normalized: inner product == cosine)
     q_vec = model.encode([query], normalize_embeddings=True).astype("float32")  # shape (1, dim)
 
     # 5) search
@@ -4,8 +4,27 @@ import difflib
 import string
 from collections import Counter
 
+import numpy as np
+
+# Optional JIT for the vocab byte scan (vectorized NumPy is the fallback)
+try:
+    from numba import njit  # type: ignore
+except Exception:
+    njit = None
+
+# Optional: SymSpell deletion index for fuzzy lookups (difflib scan is the fallback)
+try:
+    from symspellpy import SymSpell, Verbosity  # type: ignore
+except Exception:
+    SymSpell = None
+    Verbosity = None
+
 WORD_RE = re.compile(r"[a-zA-Z]{3,}")
 
+FUZZY_CUTOFF = 0.75      # min similarity for a fuzzy correction
+MAX_EDIT_DISTANCE = 2    # SymSpell dictionary / lookup depth
+PREFIX_LENGTH = 7
+
 # Words we will never try to correct (common words & domain terms)
 # Words we will never try to correct (common words & domain terms)
 # Words we will never try to correct (common words & domain terms)
@@ -34,12 +53,87 @@ DIRECT_REPLACEMENTS = {
 def tokenize(text: str):
     return WORD_RE.findall(text.lower())
 
+def _mask_words_np(arr: np.ndarray, min_len: int) -> np.ndarray:
+    low = arr | 0x20  # lowered copy
+    letter = (low >= 0x61) & (low <= 0x7A)
+    low[~letter] = 0x20
+
+    # letter runs [starts, ends); blank the short ones position by position
+    padded = np.zeros(low.size + 2, dtype=bool)
+    padded[1:-1] = letter
+    starts = np.flatnonzero(padded[1:] & ~padded[:-1])
+    ends = np.flatnonzero(~padded[1:] & padded[:-1])
+    lens = ends - starts
+    for k in range(min_len - 1):
+        low[starts[(lens < min_len) & (lens > k)] + k] = 0x20
+    return low
+
+if njit is not None:
+    @njit(cache=True)
+    def _mask_words(arr, min_len):
+        # same result as _mask_words_np in one pass over the bytes
+        out = np.empty(arr.size, dtype=np.uint8)
+        run = 0
+        for i in range(arr.size):
+            c = arr[i] | 0x20
+            if 0x61 <= c <= 0x7A:
+                out[i] = c
+                run += 1
+            else:
+                out[i] = 0x20
+                if 0 < run < min_len:
+                    out[i - run:i] = 0x20
+                run = 0
+        if 0 < run < min_len:
+            out[arr.size - run:] = 0x20
+        return out
+else:
+    _mask_words = _mask_words_np
+
+def _scan_words(buf: bytes, min_len: int = 3) -> list:
+    """
+    tokenize() over raw bytes without regex or str.lower(): ASCII letters are
+    found with one mask (b | 0x20 in 'a'..'z' holds exactly for A–Z/a–z), lowered
+    by that same OR, everything else — and letter runs shorter than `min_len` —
+    becomes a space, and bytes.split() cuts the words in C.
+    """
+    return _mask_words(np.frombuffer(buf, dtype=np.uint8), min_len).tobytes().split()
+
+def build_vocab_counts(chunks, max_words: int = 5000) -> dict:
+    """Most frequent corpus words → counts (the vocab, plus frequencies for the speller)."""
+    # one scan over all chunk texts ("\n" can't join two words)
+    buf = "\n".join(c.get("text", "") for c in chunks).encode("utf-8", errors="ignore")
+    cnt = Counter(_scan_words(buf))
+    return {w.decode("ascii"): n for w, n in cnt.most_common(max_words)}
+
 def build_vocab_from_chunks(chunks, max_words: int = 5000):
-    cnt = Counter()
-    for c in chunks:
-        cnt.update(tokenize(c.get("text", "")))
-    vocab = [w for w, _ in cnt.most_common(max_words)]
-    return set(vocab)
+    return set(build_vocab_counts(chunks, max_words))
+
+def build_speller(counts: dict):
+    """
+    SymSpell index over the vocab: precomputed deletes make a lookup ~O(1)
+    instead of difflib's pass over every vocab word. None if symspellpy is missing.
+    """
+    if SymSpell is None:
+        return None
+    sym = SymSpell(max_dictionary_edit_distance=MAX_EDIT_DISTANCE, prefix_length=PREFIX_LENGTH)
+    for word, freq in counts.items():
+        sym.create_dictionary_entry(word, freq)
+    return sym
+
+def _fuzzy_speller(tok: str, speller):
+    hits = speller.lookup(tok, Verbosity.CLOSEST, max_edit_distance=MAX_EDIT_DISTANCE)
+    if not hits:
+        return None
+    best = hits[0]  # smallest distance, then most frequent
+    # same strictness as the difflib cutoff, as a Levenshtein ratio
+    if 1 - best.distance / max(len(tok), len(best.term)) < FUZZY_CUTOFF:
+        return None
+    return best.term
+
+def _fuzzy_difflib(tok: str, vocab_list):
+    cand = difflib.get_close_matches(tok, vocab_list, n=1, cutoff=FUZZY_CUTOFF)
+    return cand[0] if cand else None
 
 def _is_titlecase(word: str) -> bool:
     # e.g., "Apple"
@@ -53,20 +147,22 @@ def _strip_punct(tok: str) -> str:
     # Remove surrounding punctuation like "factors?" -> "factors"
     return tok.strip(string.punctuation)
 
-def autocorrect_query(query: str, vocab: set[str], max_corrections: int = 2):
+def autocorrect_query(query: str, vocab_list: list, vocab_set: frozenset, max_corrections: int = 2,
+                      speller=None):
     """
     Conservative autocorrect:
       - strip trailing punctuation when comparing
       - never touch common/domain words (NEVER_CORRECT)
       - prefer deterministic DIRECT_REPLACEMENTS
-      - fuzzy match only with stricter cutoff
+      - fuzzy match only with stricter cutoff (SymSpell `speller` if given, else difflib)
       - at most `max_corrections` changes
+    `vocab_list` / `vocab_set` are built once by the caller (difflib candidates /
+    O(1) membership), not per query.
     Returns (fixed_query, did_change, corrections_dict).
     """
     words = query.split()
     changed = False
     corrections = {}
-    vocab_list = list(vocab)
 
     for i, w in enumerate(words):
         tok_raw = w.lower()
@@ -81,7 +177,7 @@ def autocorrect_query(query: str, vocab: set[str], max_corrections: int = 2):
             continue
 
         # skip short, possessive, proper nouns, or already-known vocab
-        if len(tok) < 4 or _is_possessive(w) or _is_titlecase(w) or tok in vocab:
+        if len(tok) < 4 or _is_possessive(w) or _is_titlecase(w) or tok in vocab_set:
             continue
 
         new = None
@@ -91,9 +187,10 @@ def autocorrect_query(query: str, vocab: set[str], max_corrections: int = 2):
             new = DIRECT_REPLACEMENTS[tok]
         else:
             # 2) fuzzy match (stricter)
-            cand = difflib.get_close_matches(tok, vocab_list, n=1, cutoff=0.75)
-            if cand:
-                new = cand[0]
+            if speller is not None:
+                new = _fuzzy_speller(tok, speller)
+            else:
+                new = _fuzzy_difflib(tok, vocab_list)
 
         if new and new != tok:
             # preserve case only if original was all lower; otherwise just use new
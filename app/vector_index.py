@@ -0,0 +1,220 @@
+# app/vector_index.py
+"""
+Dense vector helpers shared by build_index.py and the query CLIs.
+
+- build_index.py writes the L2-normalized chunk embeddings to
+  processed/vectors.npy (next to vectors.faiss) as float16, row i == chunk i.
+- At query time the matrix is memory-mapped and scored with one BLAS
+  matrix-vector product + argpartition. For the corpus sizes we index this
+  beats FAISS's per-query dispatch; vectors.faiss stays for very large N.
+- vectors.faiss is HNSW by default (IVF-PQ / PQ / fp16-SQ to save memory,
+  flat for exact);
+  read_faiss_index() applies the matching query-time knobs.
+- filtered_search() pushes an allowed-id set (e.g. one issuer's chunks) into
+  the FAISS search via an IDSelector instead of post-filtering the top-k, and
+  scores the allowed rows exactly when the ANN search comes back short.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+EMB_PATH = ROOT / "processed" / "vectors.npy"
+
+STORE_DTYPE = np.float16  # halves bytes streamed per query; scores stay fp32
+SCORE_BLOCK = 4096         # rows promoted to fp32 per step (~6 MB at d=384)
+
+INDEX_TYPES = ("hnsw", "ivfpq", "pq", "sqfp16", "flat")
+HNSW_M = 32              # graph degree
+EF_CONSTRUCTION = 200    # build-time beam width (recall of the graph)
+EF_SEARCH = 64           # query-time beam width
+IVFPQ_M = 32             # IVF-PQ sub-quantizers (d must be divisible; 384/32 = 12 dims each)
+PQ_M = 48                # flat PQ sub-quantizers → 48 bytes/vector at 8 bits
+IVF_NPROBE = 16          # inverted lists visited per query
+PQ_MIN_VECTORS = 256 * 39  # below this PQ codebooks can't be trained reliably
+
+
+def save_embeddings(embs: np.ndarray, path: Path = EMB_PATH, dtype=STORE_DTYPE) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(str(path), embs.astype(dtype, copy=False))
+
+
+def load_embeddings(path: Path = EMB_PATH) -> np.ndarray:
+    """Memory-map the (N, D) embedding matrix; pages are read on demand."""
+    return np.load(str(path), mmap_mode="r")
+
+
+def dense_scores(embs: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """
+    Inner products of every row with q — (D,) → (N,), or (D, B) → (N, B) for a
+    batch of queries; reduced-precision rows are promoted block-wise.
+    """
+    if embs.dtype == np.float32:
+        return embs @ q  # single SGEMV / SGEMM
+    n = embs.shape[0]
+    scores = np.empty((n,) + q.shape[1:], dtype=np.float32)
+    for start in range(0, n, SCORE_BLOCK):
+        end = min(n, start + SCORE_BLOCK)
+        scores[start:end] = embs[start:end].astype(np.float32) @ q
+    return scores
+
+
+def topk_dense(embs: np.ndarray, q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact inner-product top-k of one query vector against all rows of `embs`.
+    Returns (scores, ids) sorted by descending score — same shape as
+    index.search(q, k)[0][0], index.search(q, k)[1][0] (minus the -1 padding).
+    """
+    q = np.asarray(q, dtype=np.float32).reshape(-1)
+    scores = dense_scores(embs, q)
+    n = scores.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+    if k < n:
+        ids = np.argpartition(-scores, k - 1)[:k]
+    else:
+        ids = np.arange(n)
+    ids = ids[np.argsort(-scores[ids], kind="stable")]
+    return scores[ids], ids.astype(np.int64)
+
+
+def topk_dense_batch(embs: np.ndarray, Q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    topk_dense() for a (B, D) batch of queries with one matrix-matrix product
+    (BLAS spreads a GEMM over all cores; a GEMV per query mostly runs on one).
+    Returns (scores, ids), each (B, k) and sorted by descending score per row.
+    """
+    Q = np.asarray(Q, dtype=np.float32).reshape(-1, embs.shape[1])
+    b, n = Q.shape[0], embs.shape[0]
+    k = min(k, n)
+    if k <= 0 or b == 0:
+        return np.empty((b, 0), dtype=np.float32), np.empty((b, 0), dtype=np.int64)
+
+    scores = dense_scores(embs, Q.T).T  # (B, N)
+    if k < n:
+        ids = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        ids = np.broadcast_to(np.arange(n), (b, n))
+    top = np.take_along_axis(scores, ids, axis=1)
+    order = np.argsort(-top, axis=1, kind="stable")
+    ids = np.take_along_axis(ids, order, axis=1)
+    return np.take_along_axis(top, order, axis=1), ids.astype(np.int64)
+
+
+def build_faiss_index(embs: np.ndarray, kind: str = "hnsw"):
+    """
+    Build an inner-product FAISS index over normalized vectors (IP == cosine).
+      flat   — exact, O(N·D) per query
+      hnsw   — graph ANN, sub-linear search, full vectors kept
+      ivfpq  — inverted lists + product quantization, ~32x smaller, needs training
+      pq     — exhaustive scan over 48-byte PQ codes, needs training
+      sqfp16 — exhaustive scan over float16 vectors (half the bytes, near-exact)
+    """
+    import faiss  # only the FAISS paths need it
+
+    n, d = embs.shape
+    if kind in ("ivfpq", "pq") and n < PQ_MIN_VECTORS:
+        print(f"⚠️  Only {n} vectors; too few to train {kind}. Using HNSW instead.")
+        kind = "hnsw"
+
+    if kind == "flat":
+        index = faiss.IndexFlatIP(d)
+    elif kind == "hnsw":
+        index = faiss.index_factory(d, f"HNSW{HNSW_M}", faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = EF_CONSTRUCTION
+    elif kind == "ivfpq":
+        # ~4·sqrt(N) lists, capped at 1024 and at >= 39 training points per list
+        nlist = int(max(1, min(1024, 4 * np.sqrt(n), n // 39)))
+        index = faiss.index_factory(d, f"IVF{nlist},PQ{IVFPQ_M}", faiss.METRIC_INNER_PRODUCT)
+        index.train(embs)
+    elif kind == "pq":
+        index = faiss.IndexPQ(d, PQ_M, 8, faiss.METRIC_INNER_PRODUCT)
+        index.train(embs)
+    elif kind == "sqfp16":
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+    else:
+        raise ValueError(f"Unknown index type: {kind} (expected one of {INDEX_TYPES})")
+
+    index.add(embs)
+    return index
+
+
+def tune_for_search(index):
+    """Apply query-time settings (HNSW efSearch / IVF nprobe) to a loaded index."""
+    import faiss
+
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = EF_SEARCH
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = IVF_NPROBE
+    return index
+
+
+def read_faiss_index(path: Path, mmap: bool = True):
+    """Load vectors.faiss (memory-mapped + read-only by default, so pages load on demand)."""
+    import faiss
+
+    if mmap:
+        try:
+            index = faiss.read_index(str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            return tune_for_search(index)
+        except RuntimeError:
+            pass  # index type / faiss build without mmap support
+    return tune_for_search(faiss.read_index(str(path)))
+
+
+def _search_params(index, sel):
+    """SearchParameters carrying `sel` plus the same knobs tune_for_search() sets."""
+    import faiss
+
+    if hasattr(index, "hnsw"):
+        return faiss.SearchParametersHNSW(sel=sel, efSearch=EF_SEARCH)
+    if faiss.try_extract_index_ivf(index) is not None:
+        return faiss.SearchParametersIVF(sel=sel, nprobe=IVF_NPROBE)
+    return faiss.SearchParameters(sel=sel)
+
+
+def _subset_search(index, q: np.ndarray, k: int, allowed: np.ndarray,
+                   embs: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k over the rows in `allowed` only (vectors.npy rows, or reconstructed from the index)."""
+    rows = np.sort(allowed)  # ascending: sequential reads from the memory-mapped matrix
+    vecs = embs[rows] if embs is not None else index.reconstruct_batch(rows)
+    out_s = np.full((len(q), k), -np.inf, dtype=np.float32)
+    out_i = np.full((len(q), k), -1, dtype=np.int64)
+    for r in range(len(q)):
+        sc, local = topk_dense(vecs, q[r], k)
+        out_s[r, :len(local)] = sc
+        out_i[r, :len(local)] = rows[local]
+    return out_s, out_i
+
+
+def filtered_search(index, q: np.ndarray, k: int, allowed_ids: np.ndarray, min_hits: int = 0,
+                    embs: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    index.search(q, k) restricted to `allowed_ids`; same (scores, ids) shapes, -1 padded.
+    HNSW / IVF searches with a selector can come back short when few ids pass it; if any
+    row has fewer than min(min_hits, len(allowed_ids)) hits, the allowed rows are scored
+    exactly instead (from `embs` when given, else index.reconstruct_batch). Index types
+    without selector support always take the exact path.
+    """
+    import faiss
+
+    allowed = np.ascontiguousarray(allowed_ids, dtype=np.int64)
+    if allowed.size == 0:
+        return (np.full((len(q), k), -np.inf, dtype=np.float32),
+                np.full((len(q), k), -1, dtype=np.int64))
+    sel = faiss.IDSelectorBatch(len(allowed), faiss.swig_ptr(allowed))  # copies the ids (hash set + bloom)
+    try:
+        scores, ids = index.search(q, k, params=_search_params(index, sel))
+    except RuntimeError:
+        return _subset_search(index, q, k, allowed, embs)  # index type without selector support (e.g. IndexPQ)
+    if (ids >= 0).sum(axis=1).min() >= min(min_hits, len(allowed)):
+        return scores, ids
+    return _subset_search(index, q, k, allowed, embs)
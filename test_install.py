@@ -1,6 +1,6 @@
 # test_install.py
 import faiss
-import pdfplumber
+import pymupdf
 import pandas as pd
 import numpy as np
 from sentence_transformers import SentenceTransformer